@@ -10,6 +10,7 @@ class FindAndReplace(BaseAction):
     '''Example action with interface to find and replace in text attributes.'''
     label = 'find and replace'
     identifier = 'ftrack.test.find_and_replace'
+    cache_interface = True
 
     def discover(self, session, entities, event):
         if not self.validate_selection(entities):
@@ -39,40 +40,30 @@ class FindAndReplace(BaseAction):
         find = values.get('find')
         replace = values.get('replace')
 
-        self.find_and_replace(
+        result = self.find_and_replace(
             session, entities, attribute, find, replace
         )
 
-        try:
-            session.commit()
-        except:
-            # Commit failed, rollback session and re-raise.
-            session.rollback()
-            raise
-
         return {
-            'success': True,
-            'message': 'Find and replace "{0}" with "{1}" on attribute "{2}"'.format(
-                str(find), str(replace), attribute
+            'success': not result['failed'],
+            'message': 'Find and replace "{0}" with "{1}" on attribute "{2}" updated {3} entities, {4} failed'.format(
+                str(find), str(replace), attribute, result['updated'],
+                result['failed']
             )
         }
 
     def find_and_replace(self, session, entities, attribute, find, replace):
         '''Find and replace *find* and *replace* in *attribute* for *selection*.'''
-        for entity_type, entity_id in entities:
-            entity = session.get(entity_type, entity_id)
+        def transform(attribute, value):
+            if not isinstance(value, basestring):
+                self.logger.info(
+                    'Ignoring attribute {0!r} with non-string value'.format(attribute)
+                )
+                return value
 
-            if entity:
-                value = entity.get(attribute)
-                if not isinstance(value, basestring):
-                    self.logger.info(
-                        'Ignoring attribute {0!r} with non-string value'.format(attribute)
-                    )
-                    continue
+            return value.replace(find, replace)
 
-                entity.update({
-                    attribute: value.replace(find, replace)
-                })
+        return self.bulk_update(session, entities, [attribute], transform)
 
     def validate_selection(self, entities):
         '''Return True if *entities* is valid'''
@@ -80,6 +71,13 @@ class FindAndReplace(BaseAction):
         # For example check the length or entityType of items in selection.
         return True
 
+    def interface_cache_key(self, session, entities, event):
+        '''Share the interface between selections, it does not use them.'''
+        if event['data'].get('values'):
+            return None
+
+        return 'any selection'
+
     def interface(self, session, entities, event):
         values = event['data'].get('values', {})
 
@@ -0,0 +1,4 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2017-2020 ftrack
+
+__version__ = '0.1.dev18+g72817bbaa'
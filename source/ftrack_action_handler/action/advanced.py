@@ -1,11 +1,18 @@
 # :coding: utf-8
 # :copyright: Copyright (c) 2017-2021 ftrack
 
+import contextlib
+import functools
 import json
 import logging
 import os
+import threading
 import uuid
 import ftrack_api
+import requests
+from ftrack_action_handler import operations
+from ftrack_action_handler import permissions
+from ftrack_action_handler import resilience
 from ftrack_action_handler.action import BaseAction
 
 logging.basicConfig(level=logging.INFO)
@@ -42,6 +49,21 @@ class AdvancedBaseAction(BaseAction):
     limit_to_user = None  # Limit the action to the user which spans it
     run_as_user = False # Run as the user running the action, not the one registering it.
     allow_empty_context = False  # Allow to run without a selection
+    defer_commits = False  # Commit changes of helpers once at the end of a launch
+    discover_cache_ttl = None  # Seconds to cache user permissions for during discover
+    member_refresh_interval = 60  # Seconds to share group and role members between actions for, None queries per user
+
+    # Resilience
+    retry_attempts = 2  # Attempts of server queries made by the helpers
+    retry_backoff = 0.2  # Maximum seconds to wait before the first retry, doubled after
+    circuit_failures = 5  # Consecutive server failures failing fast after
+    circuit_reset_timeout = 30  # Seconds to fail fast for before trying the server again
+    stale_permissions_ttl = 86400  # Seconds last known permissions are served for while the server fails
+
+    __RETRY_EXCEPTIONS__ = (
+        ftrack_api.exception.ServerError,
+        requests.exceptions.RequestException
+    )
 
     def __repr__(self):
         '''Action object representation.'''
@@ -86,6 +108,7 @@ class AdvancedBaseAction(BaseAction):
 
         self._session = session
         self.job_id = None
+        self._deferred = threading.local()
 
         prefix = os.getenv('FTRACK_ACTION_PREFIX', None)
         if prefix:
@@ -117,20 +140,142 @@ class AdvancedBaseAction(BaseAction):
         action_user = self.get_action_user(event)
         action_user['metadata'][self.raw_identifier] = json.dumps(settings)
         self.logger.info('stored {0} on user {1}'.format(settings, action_user))
-        action_user.session.commit()
+        self._commit_(action_user.session)
+
+    # --------------------------------------------------------------
+    # Unit of work
+    # --------------------------------------------------------------
+
+    @contextlib.contextmanager
+    def unit_of_work(self):
+        '''Defer commits of helper methods until leaving the context.
+
+        Pending operations are committed at once when leaving the context and
+        rolled back if an error is raised. Use :meth:`flush` to commit early.
+
+        Jobs are committed right away by :meth:`create_job`, flushing the
+        operations pending at that point, and :meth:`mark_job_as_failed`
+        rolls back pending operations before committing the failed job, so
+        both survive the rollback of a failing launch.
+        '''
+        depth = getattr(self._deferred, 'depth', 0)
+        self._deferred.depth = depth + 1
+        try:
+            yield
+            if not depth:
+                self.flush()
+
+        except Exception:
+            if not depth:
+                self.logger.debug('Rolling back deferred operations.')
+                self.session.rollback()
+            raise
+
+        finally:
+            self._deferred.depth = depth
+
+    def flush(self):
+        '''Commit pending operations of the session.'''
+        if len(self.session.recorded_operations):
+            self._call_server_(self.session.commit, attempts=1)
+
+    def _commit_(self, session=None):
+        '''Commit *session*, unless commits are deferred by a unit of work.'''
+        if getattr(self._deferred, 'depth', 0):
+            return
+
+        self._call_server_((session or self.session).commit, attempts=1)
+
+    def _call_server_(self, callback, *args, **kwargs):
+        '''Return result of *callback* called with *args* against the server.
+
+        Failures to reach the server are retried up to
+        :py:attr:`retry_attempts`, or *attempts* if given, with a jittered
+        backoff, while errors reported by the server are raised right away,
+        see :func:`~ftrack_action_handler.resilience.is_transient`. Calls
+        fail fast with :exc:`~ftrack_action_handler.resilience.CircuitOpenError`
+        while the server keeps failing.
+        '''
+        return resilience.call(
+            functools.partial(callback, *args),
+            attempts=kwargs.get('attempts', self.retry_attempts),
+            backoff=self.retry_backoff,
+            exceptions=self.__RETRY_EXCEPTIONS__,
+            transient=resilience.is_transient,
+            breaker=resilience.breaker(
+                self.session.server_url,
+                failures=self.circuit_failures,
+                reset_timeout=self.circuit_reset_timeout
+            )
+        )
 
     # --------------------------------------------------------------
     # Custom Action methods
     # --------------------------------------------------------------
 
+    def _discover_cached_(self, key, factory, ttl=None, stale_ttl=None):
+        '''Return discover value cached under *key*, calling *factory* if missing.
+
+        Values are kept in the cache backend of the action and expire after
+        *ttl* seconds, or never if None. If *stale_ttl* is set the value is
+        also kept as last known value for that many seconds, and returned if
+        *factory* fails to reach the server. Errors reported by the server are
+        raised.
+        '''
+        try:
+            return self._cache.get(key)
+        except KeyError:
+            pass
+
+        try:
+            value = factory()
+        except (
+            self.__RETRY_EXCEPTIONS__ + (resilience.CircuitOpenError,)
+        ) as error:
+            value = None
+            if stale_ttl is not None and (
+                isinstance(error, resilience.CircuitOpenError) or
+                resilience.is_transient(error)
+            ):
+                value = self._get_stale_(key)
+
+            if value is None:
+                raise
+
+            self.logger.warning(
+                'Server unavailable, using last known {0}.'.format(key)
+            )
+            return value
+
+        self._cache.set(key, value, ttl=ttl)
+        if stale_ttl is not None:
+            self._cache.set(('stale',) + key, value, ttl=stale_ttl)
+
+        return value
+
+    def _get_stale_(self, key):
+        '''Return last known value cached under *key* or None.'''
+        try:
+            return self._cache.get(('stale',) + key)
+        except KeyError:
+            return None
+
     def _identify_entity_(self, entity):
-        '''Identify provided *entity*.'''
+        '''Identify provided *entity*, caching the type per entity id.'''
+        return self._discover_cached_(
+            ('type', self.session.server_url, entity.get('entityId')),
+            lambda: self._query_entity_type_(entity),
+            ttl=self.shared_cache_ttl
+        )
+
+    def _query_entity_type_(self, entity):
+        '''Query the type of provided *entity*.'''
 
         entity_types = self.__KNOWN_TYPES__
         entity_type = None
         _id = entity.get('entityId')
         for entity_type in entity_types:
-            entity = self.session.get(entity_type, _id)
+            entity = self._call_server_(self.session.get, entity_type, _id)
             has_type = getattr(entity, 'entity_type', None)
             if has_type:
                 entity_type = has_type
@@ -155,17 +300,54 @@ class AdvancedBaseAction(BaseAction):
         return it in form of an :py:class:`ftrack.UserEntity`
         '''
 
-        return self.session.query(
-            'select id, user_security_roles, username, memberships'
-            ' from User where username is "{0}"'.format(
-                event['source']['user']['username']
-            )
-        ).one()
+        return self._call_server_(
+            lambda: self.session.query(
+                'select id, user_security_roles, username, memberships'
+                ' from User where username is "{0}"'.format(
+                    event['source']['user']['username']
+                )
+            ).one()
+        )
+
+    def _get_permissions_(self, event):
+        '''Return whether the user of *event* has the permissions to run the
+        action, cached for :py:attr:`discover_cache_ttl` seconds if set.'''
+
+        if not self.allowed_roles and not self.allowed_groups:
+            return True
+
+        def check():
+            return self._check_permissions_(event['source']['user'])
+
+        if self.discover_cache_ttl is None:
+            return check()
+
+        return self._discover_cached_(
+            (
+                'permissions',
+                self.session.server_url,
+                event['source']['user']['username'],
+                tuple(sorted(self.allowed_groups)),
+                tuple(sorted(self.allowed_roles))
+            ),
+            check,
+            ttl=self.discover_cache_ttl,
+            stale_ttl=self.stale_permissions_ttl
+        )
 
     def _check_permissions_(self, ftrack_user):
         '''Checks that the specified *ftrack_user* has the permissions set in
         :py:attr:`base._base_action.BaseAction.ALLOWED_GROUPS` and
-        :py:attr:`base._base_action.BaseAction.ALLOWED_ROLES`.'''
+        :py:attr:`base._base_action.BaseAction.ALLOWED_ROLES`.
+
+        *ftrack_user* is the user of the event source, a dictionary with the
+        `id` and `username` of the user, not the User entity returned by
+        :meth:`get_action_user`.
+
+        The members of the groups and roles of the filters of all actions of
+        the session are queried together, shared by the actions and refreshed
+        every :py:attr:`member_refresh_interval` seconds. If None, only the
+        groups and roles of the user are queried on every check.'''
 
         group_valid = True
         role_valid = True
@@ -173,35 +355,32 @@ class AdvancedBaseAction(BaseAction):
         if not self.allowed_roles and not self.allowed_groups:
             return True
 
-        if self.allowed_groups:
-            group_valid = False
-            groups = self.session.query(
-                'select name, memberships from Group'
-            ).all()
-
-            group_users = []
-            for group in groups:
-                if group['name'] not in self.allowed_groups:
-                    continue
-
-                for member in group['memberships']:
-                    group_users.append(member)
+        username = ftrack_user['username']
+        interval = self.member_refresh_interval
 
-            group_users = [x['username'] for x in group_users]
-            if ftrack_user['username'] not in group_users:
-                group_valid = False
+        if self.allowed_groups:
+            if interval is None:
+                group_valid = self._call_server_(
+                    permissions.is_group_member,
+                    self.session, username, self.allowed_groups
+                )
+            else:
+                group_valid = self._call_server_(
+                    permissions.group_members(self._session).is_member,
+                    username, self.allowed_groups, interval, self.session
+                )
 
         if self.allowed_roles:
-            role_valid = False
-            _roles = []
-            roles = [
-                r['security_role']['name']
-                for r in ftrack_user['user_security_roles']
-            ]
-
-            for role in roles:
-                _roles.append(role in self.allowed_roles)
-            role_valid = any(_roles)
+            if interval is None:
+                role_valid = self._call_server_(
+                    permissions.has_security_role,
+                    self.session, username, self.allowed_roles
+                )
+            else:
+                role_valid = self._call_server_(
+                    permissions.role_members(self._session).is_member,
+                    username, self.allowed_roles, interval, self.session
+                )
 
         result = group_valid and role_valid
         return result
@@ -245,6 +424,9 @@ class AdvancedBaseAction(BaseAction):
     def _check_limit_to_user_(self, action_user):
         '''Check whether this action should be
         allowed only on the current user.
+
+        *action_user* is the user of the event source, a dictionary with the
+        `id` and `username` of the user.
         '''
         if self.limit_to_user is not None:
             if action_user['username'] != self.limit_to_user:
@@ -263,7 +445,7 @@ class AdvancedBaseAction(BaseAction):
         discoverable = True
 
         # Check user.
-        action_user = self.get_action_user(event)
+        action_user = event['source']['user']
         user_only = self._check_limit_to_user_(action_user)
         if not user_only:
             self.logger.debug(
@@ -285,7 +467,7 @@ class AdvancedBaseAction(BaseAction):
             discoverable = False
 
         # Check permissions and groups
-        has_permissions = self._check_permissions_(action_user)
+        has_permissions = self._get_permissions_(event)
         if not has_permissions:
             self.logger.debug(
                 'Action %s is not enabled user %s'
@@ -318,7 +500,8 @@ class AdvancedBaseAction(BaseAction):
         *session* is a `ftrack_api.Session` instance
 
 
-        *entities* is a list of tuples each containing the entity type and the
+        *entities* is a :class:`~ftrack_action_handler.selection.EntitySelection`
+        iterating as a list of tuples each containing the entity type and the
         entity id. If the entity is a hierarchical you will always get the
         entity type TypedContext, once retrieved through a get operation you
         will have the 'real' entity type ie. example Shot, Sequence
@@ -335,17 +518,17 @@ class AdvancedBaseAction(BaseAction):
     # --------------------------------------------------------------
 
     def create_job(self, event, description):
-        '''Create a new job.'''
+        '''Create a new job, committed right away even if commits are deferred.'''
         user_id = event['source']['user']['id']
         job = self.session.create(
             'Job',
             {
-                'user': self.session.get('User', user_id),
+                'user': self._call_server_(self.session.get, 'User', user_id),
                 'status': 'running',
                 'data': json.dumps({'description': u'{}'.format(description)}),
             },
         )
-        self.session.commit()
+        self.flush()
         job_id = job.get('id')
         self.job_id = job_id
         return self.job_id
@@ -356,41 +539,67 @@ class AdvancedBaseAction(BaseAction):
             'JobComponent', {'component_id': component_id, 'job_id': job_id}
         )
 
-        job = self.session.get('Job', job_id)
+        job = self._call_server_(self.session.get, 'Job', job_id)
         job['data'] = json.dumps({'description': u'{}'.format(description)})
         job['status'] = 'done'
-        self.session.commit()
+        self._commit_()
 
     def mark_job_as_failed(self, job_id, error_message):
-        '''Mark a job as failed.'''
+        '''Mark a job as failed.
+
+        If commits are deferred the pending operations of the failing launch
+        are rolled back first and the job is committed right away.
+        '''
+        if getattr(self._deferred, 'depth', 0):
+            self.session.rollback()
 
-        job = self.session.get('Job', job_id)
+        job = self._call_server_(self.session.get, 'Job', job_id)
         job['data'] = json.dumps({'description': u'{}'.format(error_message)})
         job['status'] = 'failed'
-        self.session.commit()
+        self.flush()
 
     def mark_job_as_done(self, job_id, description):
         '''Mark a job as done.'''
 
-        job = self.session.get('Job', job_id)
+        job = self._call_server_(self.session.get, 'Job', job_id)
         job['data'] = json.dumps({'description': u'{}'.format(description)})
         job['status'] = 'done'
-        self.session.commit()
+        self._commit_()
 
-    def _launch(self, event):
-        if self.run_as_user:
-            user = event['source']['user']['username']
-            try:
-                new_session = ftrack_api.Session(
-                    server_url=self.session.server_url,
-                    api_key=self.session.api_key,
-                    api_user=user,
-                    auto_connect_event_hub=False
-                )
-            except Exception:
-                self.logger.warn('Please ensure your action has been registered with a Global API key.')
-                raise
+    @contextlib.contextmanager
+    def _launch_scope(self, event):
+        '''Scope the launch of *event*, deferring commits if enabled.'''
+        with super(AdvancedBaseAction, self)._launch_scope(event):
+            if not self.defer_commits:
+                yield
+                return
 
-            self._session = new_session
+            with self.unit_of_work():
+                yield
 
-        return super(AdvancedBaseAction, self)._launch(event)
+    def _launch(self, event):
+        if not self.run_as_user:
+            return super(AdvancedBaseAction, self)._launch(event)
+
+        user = event['source']['user']['username']
+        try:
+            new_session = ftrack_api.Session(
+                server_url=self.session.server_url,
+                api_key=self.session.api_key,
+                api_user=user,
+                auto_connect_event_hub=False
+            )
+        except Exception:
+            self.logger.warn('Please ensure your action has been registered with a Global API key.')
+            raise
+
+        if self.max_queries is not None:
+            operations.counter(new_session)
+
+        # Only this launch runs as the user, replies and other events keep
+        # using the session the action was registered with.
+        try:
+            with self._using_session(new_session):
+                return super(AdvancedBaseAction, self)._launch(event)
+        finally:
+            new_session.close()
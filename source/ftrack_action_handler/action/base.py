@@ -1,11 +1,28 @@
 # :coding: utf-8
 # :copyright: Copyright (c) 2017-2021 ftrack
 
+import contextlib
+import copy
+import functools
 import json
 import logging
 import os
+import threading
+import time
 import uuid
 
+from ftrack_action_handler import dispatch
+from ftrack_action_handler import health
+from ftrack_action_handler import operations
+from ftrack_action_handler import sessions
+from ftrack_action_handler.cache import SqliteCache, session_cache
+from ftrack_action_handler.memory import CacheScope
+from ftrack_action_handler.prewarm import prewarm
+from ftrack_action_handler.profiling import Profiler
+from ftrack_action_handler.registry import registered
+from ftrack_action_handler.replay import Recorder
+from ftrack_action_handler.selection import EntitySelection
+
 logging.basicConfig(level=logging.INFO)
 
 # --------------------------------------------------------------
@@ -32,6 +49,48 @@ class BaseAction(object):
     description = None
     icon = None
 
+    # Profiling
+    profile_sample_rate = 0.0  # Fraction of discover and launch calls to profile
+    profile_threshold = 1.0  # Only write profiles of calls slower than this, in seconds
+    profile_directory = None  # Where to write profiles, defaults to current directory
+
+    # Recording
+    record_path = None  # Record handled events to this JSON lines file
+
+    # Health
+    health_port = None  # Serve health and load statistics on this local port
+    health_host = '127.0.0.1'  # Interface the health statistics are served on
+
+    # Startup
+    prewarm_caches = False  # Warm schemas, groups and roles in the background on register
+
+    # Discover
+    discover_timeout = None  # Seconds to reply to discover within, no limit if None
+    discover_workers = 4  # Threads running discovers with a timeout, each with a session reserved on register
+    parallel_discover = False  # Evaluate discover with the other actions in parallel
+    parallel_discover_workers = 8  # Maximum number of actions discovered at once
+    parallel_discover_timeout = None  # Seconds to gather parallel discovers within
+
+    # Launch
+    coalesce_window = None  # Seconds to merge launches by the same user within
+
+    # Budgets
+    max_queries = None  # Server operations allowed per discover or launch
+    max_concurrent_launches = None  # Launches allowed at once, ie. coalesced ones running beside the event hub
+    enforce_budgets = False  # Abort instead of only reporting when over budget
+
+    # Cache backend
+    cache_backend = None  # Cache shared between actions and processes, ie. a SqliteCache
+    shared_cache_ttl = 3600  # Seconds entity types are kept in the cache backend
+
+    # Session cache
+    release_launch_cache = False  # Release entities cached during a launch
+    cache_fifo_limit = None  # Entities kept in the session cache, oldest removed first
+
+    # Interface
+    cache_interface = False  # Cache definitions returned by interface under interface_cache_key
+    interface_ttl = None  # Seconds before cached definitions expire, never if None
+
     def __init__(self, session):
         '''Expects a ftrack_api.Session instance'''
 
@@ -50,27 +109,142 @@ class BaseAction(object):
             )
 
         self._session = session
+        self._worker = threading.local()
+
+        self._profiler = None
+        if self.profile_sample_rate:
+            self._profiler = Profiler(
+                sample_rate=self.profile_sample_rate,
+                threshold=self.profile_threshold,
+                directory=self.profile_directory
+            )
+
+        self._recorder = None
+        if self.record_path:
+            self._recorder = Recorder(self.record_path)
+
+        self._statistics = None
+        if self.health_port is not None:
+            self._statistics = health.statistics
+
+        self.memory_usage = {
+            'launches': 0,
+            'cache_added': 0,
+            'cache_released': 0,
+            'cache_size': 0,
+            'allocated': None
+        }
+
+        # Caches are shared per session so they survive plugin reloads.
+        self._interface_cache = session_cache(session)
+
+        self._cache = self.cache_backend
+        if self._cache is None:
+            path = os.getenv('FTRACK_ACTION_CACHE_PATH', None)
+            self._cache = SqliteCache(path) if path else session_cache(session)
+
+        self.discover_overruns = 0
+        self._discover_workers = threading.Semaphore(self.discover_workers)
+        self._discover_pool = dispatch.WorkerPool(self.discover_workers)
+
+        self.ready = threading.Event()
+        self.ready.set()
+
+        # Set while a replacement registers, see unregister.
+        self.retired = False
+
+        self._subscriptions = []
+        self._in_flight = 0
+        self._in_flight_condition = threading.Condition()
+
+        self._batches = {}
+        self._batches_lock = threading.Lock()
+
+        self.budget_overruns = 0
 
     @property
     def session(self):
-        '''Return current session.'''
+        '''Return current session.
+
+        Sessions are not safe to use from several threads at once. Work done
+        outside the event hub thread, such as parallel discovers, discovers
+        running past :attr:`discover_timeout` and coalesced launches, gets a
+        session of its own worker instead, so entities should not be shared
+        between calls.
+        '''
+        session = getattr(self._worker, 'session', None)
+        if session is not None:
+            return session
+
         return self._session
 
+    @contextlib.contextmanager
+    def _using_session(self, session):
+        '''Use *session* as :attr:`session` in the current thread.'''
+        previous = getattr(self._worker, 'session', None)
+        self._worker.session = session
+        try:
+            yield
+        finally:
+            self._worker.session = previous
+
+    @contextlib.contextmanager
+    def _worker_session(self):
+        '''Use a session of a worker in the current thread.'''
+        with sessions.worker_sessions(self._session).acquire() as session:
+            if self.max_queries is not None:
+                operations.counter(session)
+
+            with self._using_session(session):
+                yield
+
+    def _in_worker(self, callback, *args):
+        '''Return result of *callback* with *args* using a worker session.'''
+        with self._worker_session():
+            return callback(*args)
+
     def register(self, standalone=False):
         '''Registers the action, subscribing the the discover and launch topics.
            *standalone* lets the action run in self.session useful for testing
            and development
         '''
-        self.session.event_hub.subscribe(
-            'topic=ftrack.action.discover', self._discover
-        )
+        if self.health_port is not None:
+            health.serve(self.session, self.health_port, self.health_host)
+
+        if self.prewarm_caches:
+            self.ready = prewarm(self)
+
+        # Sessions of workers take long to create, do so before the first
+        # discovers run against their time budget.
+        reserved = 0
+        if self.discover_timeout is not None:
+            reserved = self.discover_workers
+
+        if self.parallel_discover:
+            reserved = max(reserved, self.parallel_discover_workers)
+
+        if reserved:
+            sessions.worker_sessions(self._session).reserve(reserved)
+
+        self._subscriptions = [
+            self.session.event_hub.subscribe(
+                'topic=ftrack.action.launch and data.actionIdentifier={0}'.format(
+                    self.identifier
+                ),
+                self._handle_launch
+            )
+        ]
 
-        self.session.event_hub.subscribe(
-            'topic=ftrack.action.launch and data.actionIdentifier={0}'.format(
-                self.identifier
-            ),
-            self._launch
-        )
+        if self.parallel_discover:
+            dispatch.dispatcher(self.session).add(self)
+        else:
+            self._subscriptions.append(
+                self.session.event_hub.subscribe(
+                    'topic=ftrack.action.discover', self._handle_discover
+                )
+            )
+
+        registered.add(self)
 
         if standalone:
             self.logger.debug(
@@ -80,6 +254,303 @@ class BaseAction(object):
             )
             self.session.event_hub.wait()
 
+    def unregister(self, timeout=None):
+        '''Unsubscribe the action from the discover and launch topics.
+
+        Wait up to *timeout* seconds, or indefinitely if None, for launches in
+        progress to finish. Return whether all launches finished.
+
+        Set :attr:`retired` before registering a replacement to stop handling
+        events while still subscribed, so events arriving until this action
+        is unregistered are only handled by the replacement.
+        '''
+        for subscription in self._subscriptions:
+            self.session.event_hub.unsubscribe(subscription)
+
+        self._subscriptions = []
+        if self.parallel_discover:
+            dispatch.dispatcher(self.session).remove(self)
+
+        registered.discard(self)
+
+        deadline = None
+        if timeout is not None:
+            deadline = time.time() + timeout
+
+        with self._in_flight_condition:
+            while self._in_flight or self._batches:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+
+                self._in_flight_condition.wait(remaining)
+
+            return not self._in_flight and not self._batches
+
+    def _handle_discover(self, event):
+        '''Handle discover *event* received from the event hub.'''
+        if self.retired:
+            return None
+
+        if self.discover_timeout is None:
+            return self._call('discover', self._discover, event)
+
+        return self._call('discover', self._discover_within_timeout, event)
+
+    def _handle_launch(self, event):
+        '''Handle launch *event* received from the event hub.'''
+        if self.retired:
+            return None
+
+        if self.coalesce_window and self._coalescable(event):
+            return self._coalesce(event)
+
+        rejected = self._check_concurrency(event, self._in_flight)
+        if rejected is not None:
+            return rejected
+
+        with self._launching():
+            return self._call('launch', self._launch, event)
+
+    def _check_concurrency(self, event, running):
+        '''Return rejection of launch *event* if *running* launches are too many.
+
+        Going over :attr:`max_concurrent_launches` is reported, and only
+        rejected if :attr:`enforce_budgets` is set.
+        '''
+        if (
+            self.max_concurrent_launches is None or
+            running < self.max_concurrent_launches
+        ):
+            return None
+
+        self._report_budget(
+            'launch', event, '{0} launches already in progress'.format(
+                running
+            )
+        )
+        if self.enforce_budgets:
+            return {
+                'success': False,
+                'message': 'Too many launches of {0} in progress.'.format(
+                    self.label
+                )
+            }
+
+    @contextlib.contextmanager
+    def _launching(self):
+        '''Count a launch in progress.'''
+        with self._in_flight_condition:
+            self._in_flight += 1
+
+        try:
+            yield
+        finally:
+            with self._in_flight_condition:
+                self._in_flight -= 1
+                self._in_flight_condition.notify_all()
+
+    def _coalescable(self, event):
+        '''Return whether launch *event* can be merged with other launches.
+
+        Events are merged before :meth:`interface` is called, so only events
+        with submitted values, or launches of actions without an interface,
+        are merged.
+        '''
+        if event['data'].get('values'):
+            return True
+
+        return type(self).interface is BaseAction.interface
+
+    def _coalesce(self, event):
+        '''Add launch *event* to a batch of launches by the same user.
+
+        Called by :meth:`_handle_launch` before the launch is handled. The
+        batch is launched once over the merged selection when
+        :attr:`coalesce_window` has passed, replying the shared result to each
+        event.
+        '''
+        key = (
+            event['source'].get('user', {}).get('username'),
+            json.dumps(event['data'].get('values') or {}, sort_keys=True)
+        )
+
+        with self._batches_lock:
+            batch = self._batches.get(key)
+            if batch is None:
+                batch = self._batches[key] = []
+
+                timer = threading.Timer(
+                    self.coalesce_window, self._launch_batch, [key]
+                )
+                timer.daemon = True
+                timer.start()
+
+            batch.append(event)
+
+        # Replied to once the batch is launched.
+        return None
+
+    def _launch_batch(self, key):
+        '''Launch batch of events under *key* and reply to each event.'''
+        with self._launching():
+            with self._batches_lock:
+                batch = self._batches.pop(key)
+
+            with self._worker_session():
+                self._launch_merged(batch)
+
+    def _launch_merged(self, batch):
+        '''Launch events of *batch* over their merged selection.'''
+        selection = []
+        seen = set()
+        for source in batch:
+            for item in source['data'].get('selection', []):
+                identity = (item.get('entityType'), item.get('entityId'))
+                if identity not in seen:
+                    seen.add(identity)
+                    selection.append(item)
+
+        event = copy.deepcopy(batch[-1])
+        event['data']['selection'] = selection
+
+        self.logger.debug(
+            'Launching {0} events of {1} over {2} entities.'.format(
+                len(batch), self.identifier, len(selection)
+            )
+        )
+
+        # Launches by other threads than this one.
+        result = self._check_concurrency(event, self._in_flight - 1)
+        if result is None:
+            try:
+                result = self._call('launch', self._launch, event)
+            except Exception as error:
+                self.logger.exception(
+                    'Launch of {0} failed.'.format(self.identifier)
+                )
+                result = {
+                    'success': False,
+                    'message': str(error)
+                }
+
+        if result is not None:
+            # Worker sessions are not connected to the event hub.
+            for source in batch:
+                self._session.event_hub.publish_reply(source, result)
+
+    def _call(self, name, callback, event):
+        '''Return result of *callback* for *event*, profiling it if sampled.'''
+        if self.max_queries is not None:
+            callback = functools.partial(self._budgeted, name, callback)
+
+        if self._recorder is not None:
+            callback = functools.partial(
+                self._recorder, name, self.identifier, callback
+            )
+
+        if self._statistics is not None:
+            callback = functools.partial(
+                self._statistics, name, self.identifier, callback
+            )
+
+        if self._profiler is None:
+            return callback(event)
+
+        return self._profiler(name, self.identifier, callback, event)
+
+    def _budgeted(self, name, callback, event):
+        '''Return result of *callback* for *event* within :attr:`max_queries`.'''
+        operations.counter(self.session)
+        scope = operations.OperationScope(
+            limit=self.max_queries,
+            strict=self.enforce_budgets,
+            exceeded=lambda scope: self._report_budget(
+                name, event, 'more than {0} server operations'.format(
+                    scope.limit
+                )
+            )
+        )
+
+        with scope:
+            try:
+                return callback(event)
+            finally:
+                self.logger.debug(
+                    '{0} {1} of {2} made {3} server operations in {4} '
+                    'calls.'.format(
+                        name.title(), event.get('id'), self.identifier,
+                        scope.total, scope.calls
+                    )
+                )
+
+    def _report_budget(self, name, event, reason):
+        '''Count and log *name* of *event* going over budget for *reason*.'''
+        self.budget_overruns += 1
+        self.logger.warning(
+            '{0} {1} of {2} is over budget, {3}.'.format(
+                name.title(), event.get('id'), self.identifier, reason
+            )
+        )
+
+    def _discover_within_timeout(self, event):
+        '''Return result of discover for *event* if within :attr:`discover_timeout`.
+
+        Discovers run on up to :attr:`discover_workers` long lived threads,
+        each with a session of its own reserved on register. Discovers
+        exceeding the timeout are not replied to but left running in the
+        background, so their results can warm caches for later events.
+        '''
+        if not self._discover_workers.acquire(False):
+            self._discover_overrun(event, 'no discover worker available')
+            return None
+
+        result = {}
+        done = threading.Event()
+        late = threading.Event()
+        scopes = operations.active()
+
+        def run():
+            try:
+                with operations.activated(scopes):
+                    result['value'] = self._in_worker(self._discover, event)
+            except Exception as error:
+                result['error'] = error
+                if late.is_set():
+                    self.logger.exception(
+                        'Discover of {0} failed after timeout.'.format(
+                            self.identifier
+                        )
+                    )
+            finally:
+                self._discover_workers.release()
+                done.set()
+
+        self._discover_pool.submit(run)
+
+        if not done.wait(self.discover_timeout):
+            late.set()
+            self._discover_overrun(
+                event, 'exceeded {0}s'.format(self.discover_timeout)
+            )
+            return None
+
+        if 'error' in result:
+            raise result['error']
+
+        return result.get('value')
+
+    def _discover_overrun(self, event, reason):
+        '''Count and log discover of *event* abandoned for *reason*.'''
+        self.discover_overruns += 1
+        self.logger.warning(
+            'Not replying to discover {0} of {1}, {2}.'.format(
+                event.get('id'), self.identifier, reason
+            )
+        )
+
     def _discover(self, event):
         args = self._translate_event(
             self.session, event
@@ -107,7 +578,8 @@ class BaseAction(object):
         *session* is a `ftrack_api.Session` instance
 
 
-        *entities* is a list of tuples each containing the entity type and the entity id.
+        *entities* is a :class:`~ftrack_action_handler.selection.EntitySelection`
+        iterating as a list of tuples each containing the entity type and the entity id.
         If the entity is a hierarchical you will always get the entity
         type TypedContext, once retrieved through a get operation you
         will have the "real" entity type ie. example Shot, Sequence
@@ -124,61 +596,115 @@ class BaseAction(object):
 
         _selection = event['data'].get('selection', [])
 
-        _entities = list()
-        for entity in _selection:
-            _entities.append(
-                (
-                    self._get_entity_type(entity), entity.get('entityId')
-                )
-            )
+        # Entities are grouped as they are translated, without an
+        # intermediate list.
+        table = self._entity_type_table() if _selection else None
+        _entities = (
+            (self._get_entity_type(entity, table), entity.get('entityId'))
+            for entity in _selection
+        )
 
         return [
-            _entities,
+            EntitySelection(_entities),
             event
         ]
 
-    def _get_entity_type(self, entity):
-        '''Return translated entity type tht can be used with API.'''
+    def _get_entity_type(self, entity, table=None):
+        '''Return translated entity type tht can be used with API.
+
+        *table* is the entity type table to use, read from the cache backend
+        if None.
+        '''
         # Get entity type and make sure it is lower cased. Most places except
         # the component tab in the Sidebar will use lower case notation.
         entity_type = entity.get('entityType').replace('_', '').lower()
 
-        for schema in self.session.schemas:
-            alias_for = schema.get('alias_for')
-
-            if (
-                alias_for and isinstance(alias_for, str) and
-                alias_for.lower() == entity_type
-            ):
-                return schema['id']
+        if table is None:
+            table = self._entity_type_table()
 
-        for schema in self.session.schemas:
-            if schema['id'].lower() == entity_type:
-                    return schema['id']
+        try:
+            return table[entity_type]
+        except KeyError:
+            raise ValueError(
+                'Unable to translate entity type: {0}.'.format(entity_type)
+            )
 
-        raise ValueError(
-            'Unable to translate entity type: {0}.'.format(entity_type)
+    def _entity_type_table(self):
+        '''Return dictionary of lower cased entity types and aliases to the
+        entity types of the session schemas, kept in the cache backend.
+
+        The table is read from the backend on every call, so removing it
+        there rebuilds it in all processes sharing the backend.'''
+        key = ('entity_types', self.session.server_url)
+        try:
+            table = self._cache.get(key)
+        except KeyError:
+            table = {}
+            aliases = {}
+            for schema in self.session.schemas:
+                table.setdefault(schema['id'].lower(), schema['id'])
+
+                alias_for = schema.get('alias_for')
+                if alias_for and isinstance(alias_for, str):
+                    aliases.setdefault(alias_for.lower(), schema['id'])
+
+            # Aliases take precedence over entity types of the same name.
+            table.update(aliases)
+            self._cache.set(key, table, ttl=self.shared_cache_ttl)
+
+        return table
+
+    @contextlib.contextmanager
+    def _launch_scope(self, event):
+        '''Scope the session cache to the launch of *event*.'''
+        if not self.release_launch_cache and self.cache_fifo_limit is None:
+            yield
+            return
+
+        scope = CacheScope(
+            self.session,
+            release=self.release_launch_cache,
+            fifo_limit=self.cache_fifo_limit
         )
+        try:
+            with scope:
+                yield
+
+        finally:
+            self.memory_usage['launches'] += 1
+            self.memory_usage['cache_added'] += scope.added
+            self.memory_usage['cache_released'] += scope.released
+            self.memory_usage['cache_size'] = scope.size
+            self.memory_usage['allocated'] = scope.allocated
+
+            self.logger.debug(
+                'Action {0} launch {1} cached {2} entities, released {3}, '
+                '{4} left in cache.'.format(
+                    self.identifier, event.get('id'), scope.added,
+                    scope.released, scope.size
+                )
+            )
 
     def _launch(self, event):
-        args = self._translate_event(
-            self.session, event
-        )
+        with self._launch_scope(event):
+            args = self._translate_event(
+                self.session, event
+            )
 
-        interface = self._interface(
-            self.session, *args
-        )
+            interface = self._interface(
+                self.session, *args
+            )
 
-        if interface:
-            return interface
+            if interface:
+                return interface
 
-        response = self.launch(
-            self.session, *args
-        )
+            response = self.launch(
+                self.session, *args
+            )
 
-        return self._handle_result(
-            self.session, response, *args
-        )
+            return self._handle_result(
+                self.session, response, *args
+            )
 
     def launch(self, session, entities, event):
         '''Callback method for the custom action.
@@ -190,7 +716,8 @@ class BaseAction(object):
 
         *session* is a `ftrack_api.Session` instance
 
-        *entities* is a list of tuples each containing the entity type and the entity id.
+        *entities* is a :class:`~ftrack_action_handler.selection.EntitySelection`
+        iterating as a list of tuples each containing the entity type and the entity id.
         If the entity is a hierarchical you will always get the entity
         type TypedContext, once retrieved through a get operation you
         will have the "real" entity type ie. example Shot, Sequence
@@ -202,19 +729,102 @@ class BaseAction(object):
         raise NotImplementedError()
 
     def _interface(self, *args):
-        interface = self.interface(*args)
+        if self.cache_interface:
+            interface = self._cached_interface(*args)
+        else:
+            interface = self.interface(*args)
 
         if interface:
             return {
                 'items': interface
             }
 
+    def _cached_interface(self, session, entities, event):
+        '''Return interface from cached template merged with event values.'''
+        key = self.interface_cache_key(session, entities, event)
+        if key is None:
+            return self.interface(session, entities, event)
+
+        key = ('interface', self.__class__.identifier, key)
+        try:
+            template = self._interface_cache.get(key)
+        except KeyError:
+            template = self.interface(session, entities, event)
+            self._interface_cache.set(key, template, ttl=self.interface_ttl)
+
+        if not template:
+            return template
+
+        values = self.interface_values(session, entities, event)
+
+        interface = []
+        for item in template:
+            name = item.get('name')
+            if name in values:
+                item = dict(item, value=values[name])
+            else:
+                item = copy.copy(item)
+
+            interface.append(item)
+
+        return interface
+
+    def cached(self, key, factory, ttl=None):
+        '''Return value cached under *key*, calling *factory* if missing.
+
+        Use to cache data expensive to query, such as enumerator data, used
+        by :meth:`interface`. *ttl* is the number of seconds before the value
+        expires, defaults to :attr:`interface_ttl`.
+
+        '''
+        key = ('data', self.__class__.identifier, key)
+        try:
+            return self._interface_cache.get(key)
+        except KeyError:
+            value = factory()
+            if ttl is None:
+                ttl = self.interface_ttl
+
+            self._interface_cache.set(key, value, ttl=ttl)
+            return value
+
+    def interface_cache_key(self, session, entities, event):
+        '''Return key the result of :meth:`interface` is cached under.
+
+        Return None to not cache the interface for this event, the default.
+        Override to return a constant key if the interface does not depend on
+        the selected entities, so one definition is shared by all selections.
+        Keys are scoped to the action. Keys made from the selection add a
+        cache entry per selection, kept until :attr:`interface_ttl` expires.
+
+        *session* is a `ftrack_api.Session` instance
+
+        *entities* is a list of tuples each containing the entity type and the entity id.
+
+        *event* the unmodified original event
+        '''
+        return None
+
+    def interface_values(self, session, entities, event):
+        '''Return dictionary of values to merge into a cached interface.
+
+        Values are set on the interface items with a matching name.
+
+        *session* is a `ftrack_api.Session` instance
+
+        *entities* is a list of tuples each containing the entity type and the entity id.
+
+        *event* the unmodified original event
+        '''
+        return event['data'].get('values') or {}
+
     def interface(self, session, entities, event):
         '''Return a interface if applicable or None
 
         *session* is a `ftrack_api.Session` instance
 
-        *entities* is a list of tuples each containing the entity type and the entity id.
+        *entities* is a :class:`~ftrack_action_handler.selection.EntitySelection`
+        iterating as a list of tuples each containing the entity type and the entity id.
         If the entity is a hierarchical you will always get the entity
         type TypedContext, once retrieved through a get operation you
         will have the "real" entity type ie. example Shot, Sequence
@@ -224,6 +834,108 @@ class BaseAction(object):
         '''
         return None
 
+    def bulk_update(
+        self, session, entities, attributes, transform, chunk_size=100,
+        batch_size=100
+    ):
+        '''Update *attributes* of *entities* with *transform*, committing in chunks.
+
+        *session* is a `ftrack_api.Session` instance
+
+        *entities* is a :class:`~ftrack_action_handler.selection.EntitySelection`
+        or a list of tuples each containing the entity type and the entity id.
+
+        *attributes* is a list of attribute names to update.
+
+        *transform* is called with the attribute name and current value of each
+        attribute and returns the new value. Unchanged values are skipped.
+
+        Entities are loaded with their *attributes* in queries of at most
+        *batch_size* entities and changes committed every *chunk_size* changed
+        entities. A failing chunk is rolled back while later chunks are still
+        committed.
+
+        Each chunk commits, or rolls back, all pending operations of
+        *session*, so the session must have none when called. Raise
+        RuntimeError otherwise, ie. when called within a unit of work with
+        deferred changes, and commit or roll back those first.
+
+        Return a dictionary with the number of `updated`, `unchanged` and
+        `failed` entities, a list of `errors`, each a dictionary with the
+        `ids` of the entities in the failed chunk and the error `message`,
+        and a list of `missing` entity type and id tuples for entities which
+        were not found.
+        '''
+        if len(session.recorded_operations):
+            raise RuntimeError(
+                'Unable to update entities in bulk with {0} pending '
+                'operations, commit or roll them back first.'.format(
+                    len(session.recorded_operations)
+                )
+            )
+
+        if not isinstance(entities, EntitySelection):
+            entities = EntitySelection(entities)
+
+        result = {
+            'updated': 0,
+            'unchanged': 0,
+            'failed': 0,
+            'errors': [],
+            'missing': []
+        }
+        chunk = []
+        found = set()
+
+        def commit():
+            try:
+                session.commit()
+            except Exception as error:
+                session.rollback()
+                self.logger.exception(
+                    'Updating {0} entities failed.'.format(len(chunk))
+                )
+                result['failed'] += len(chunk)
+                result['errors'].append({
+                    'ids': list(chunk),
+                    'message': str(error)
+                })
+            else:
+                result['updated'] += len(chunk)
+
+            del chunk[:]
+
+        for entity in entities.entities(
+            session, attributes=attributes, batch_size=batch_size
+        ):
+            found.add(entity['id'])
+            changes = {}
+            for attribute in attributes:
+                value = entity[attribute]
+                new_value = transform(attribute, value)
+                if new_value != value:
+                    changes[attribute] = new_value
+
+            if not changes:
+                result['unchanged'] += 1
+                continue
+
+            entity.update(changes)
+            chunk.append(entity['id'])
+            if len(chunk) >= chunk_size:
+                commit()
+
+        if chunk:
+            commit()
+
+        for entity_type, ids in entities.by_type().items():
+            result['missing'].extend(
+                (entity_type, entity_id) for entity_id in ids
+                if entity_id not in found
+            )
+
+        return result
+
     def _handle_result(self, session, result, entities, event):
         '''Validate the returned result from the action callback'''
         if isinstance(result, bool):
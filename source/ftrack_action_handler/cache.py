@@ -0,0 +1,233 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import json
+import sqlite3
+import threading
+import time
+import weakref
+
+
+class MemoryCache(object):
+    '''Thread safe in memory cache with optional expiry.
+
+    `ttl` default number of seconds before a value expires, values never
+    expire if None.
+
+    `sweep_interval` seconds between removals of all expired values, done
+    while setting a value. Expired values are also removed when read.
+
+    '''
+
+    def __init__(self, ttl=None, sweep_interval=60):
+        '''Initialise cache.'''
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._values = {}
+        self._lock = threading.Lock()
+        self._swept = time.time()
+
+    def get(self, key):
+        '''Return value for *key*.
+
+        Raise KeyError if *key* is not in the cache or has expired.
+
+        '''
+        with self._lock:
+            value, expires = self._values[key]
+            if expires is not None and expires <= time.time():
+                del self._values[key]
+                raise KeyError(key)
+
+        return value
+
+    def set(self, key, value, ttl=None):
+        '''Set *value* for *key*, expiring after *ttl* or the default ttl.'''
+        if ttl is None:
+            ttl = self.ttl
+
+        expires = None
+        if ttl is not None:
+            expires = time.time() + ttl
+
+        with self._lock:
+            self._values[key] = (value, expires)
+            if time.time() - self._swept >= self.sweep_interval:
+                self._sweep()
+
+    def sweep(self):
+        '''Remove all expired values.'''
+        with self._lock:
+            self._sweep()
+
+    def _sweep(self):
+        '''Remove all expired values, with the lock held.'''
+        now = time.time()
+        for key, (_, expires) in list(self._values.items()):
+            if expires is not None and expires <= now:
+                del self._values[key]
+
+        self._swept = now
+
+    def remove(self, key):
+        '''Remove *key*, raise KeyError if not in the cache.'''
+        with self._lock:
+            del self._values[key]
+
+    def keys(self):
+        '''Return list of keys in the cache.'''
+        with self._lock:
+            return list(self._values.keys())
+
+    def clear(self):
+        '''Remove all values from the cache.'''
+        with self._lock:
+            self._values.clear()
+
+
+class SqliteCache(object):
+    '''Cache stored in a SQLite database shared between processes.
+
+    `path` of the database file, created if missing.
+
+    `ttl` default number of seconds before a value expires, values never
+    expire if None.
+
+    `sweep_interval` seconds between removals of all expired values, done
+    while setting a value. Expired values are also removed when read.
+
+    Keys and values must be serialisable to JSON. Values set or removed by
+    one process are seen by all processes using the same file.
+
+    '''
+
+    def __init__(self, path, ttl=None, sweep_interval=60):
+        '''Initialise cache.'''
+        self.path = path
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+        self._swept = time.time()
+
+        with self._connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)'
+            )
+
+    def _connection(self):
+        '''Return connection to the database for the current thread.'''
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+
+        return connection
+
+    def _encode(self, key):
+        '''Return *key* encoded for storage.'''
+        return json.dumps(key, sort_keys=True)
+
+    def _decode(self, key):
+        '''Return *key* decoded from storage.'''
+        key = json.loads(key)
+        if isinstance(key, list):
+            key = tuple(key)
+
+        return key
+
+    def get(self, key):
+        '''Return value for *key*.
+
+        Raise KeyError if *key* is not in the cache or has expired.
+
+        '''
+        connection = self._connection()
+        row = connection.execute(
+            'SELECT value, expires FROM cache WHERE key = ?',
+            (self._encode(key),)
+        ).fetchone()
+
+        if row is None:
+            raise KeyError(key)
+
+        value, expires = row
+        if expires is not None and expires <= time.time():
+            with connection:
+                connection.execute(
+                    'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                    (self._encode(key), time.time())
+                )
+            raise KeyError(key)
+
+        return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        '''Set *value* for *key*, expiring after *ttl* or the default ttl.'''
+        if ttl is None:
+            ttl = self.ttl
+
+        expires = None
+        if ttl is not None:
+            expires = time.time() + ttl
+
+        with self._connection() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                (self._encode(key), json.dumps(value), expires)
+            )
+
+        if time.time() - self._swept >= self.sweep_interval:
+            self.sweep()
+
+    def sweep(self):
+        '''Remove all expired values.'''
+        self._swept = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE expires <= ?', (self._swept,)
+            )
+
+    def remove(self, key):
+        '''Remove *key*, raise KeyError if not in the cache.'''
+        with self._connection() as connection:
+            cursor = connection.execute(
+                'DELETE FROM cache WHERE key = ?', (self._encode(key),)
+            )
+
+        if not cursor.rowcount:
+            raise KeyError(key)
+
+    def keys(self):
+        '''Return list of keys in the cache.'''
+        rows = self._connection().execute(
+            'SELECT key FROM cache WHERE expires IS NULL OR expires > ?',
+            (time.time(),)
+        ).fetchall()
+        return [self._decode(key) for key, in rows]
+
+    def clear(self):
+        '''Remove all values from the cache.'''
+        with self._connection() as connection:
+            connection.execute('DELETE FROM cache')
+
+
+_session_caches = weakref.WeakKeyDictionary()
+_session_caches_lock = threading.Lock()
+
+
+def session_cache(session):
+    '''Return :class:`MemoryCache` shared by the actions of *session*.
+
+    The cache outlives the actions, so actions replaced when their plugin is
+    reloaded find the values cached by their predecessors.
+
+    '''
+    with _session_caches_lock:
+        cache = _session_caches.get(session)
+        if cache is None:
+            cache = _session_caches[session] = MemoryCache()
+
+    return cache
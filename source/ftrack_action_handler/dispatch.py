@@ -0,0 +1,222 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import logging
+import threading
+import time
+import weakref
+
+try:
+    import queue
+except ImportError:
+    # Python 2.
+    import Queue as queue
+
+
+class QueueFullError(RuntimeError):
+    '''Raise when a task is submitted to a pool with a full queue.'''
+
+
+class TaskExpiredError(RuntimeError):
+    '''Raise when a task was not started before its deadline.'''
+
+
+class Task(object):
+    '''Callback run by a :class:`WorkerPool`.'''
+
+    def __init__(self, callback, args, deadline=None):
+        '''Initialise task calling *callback* with *args*.
+
+        The task is dropped if not started by *deadline*, a time in seconds
+        since the epoch.
+        '''
+        self.callback = callback
+        self.args = args
+        self.deadline = deadline
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def run(self):
+        '''Run callback, storing its result or error.'''
+        try:
+            if self.deadline is not None and time.time() > self.deadline:
+                raise TaskExpiredError('Task not started before its deadline.')
+
+            self.result = self.callback(*self.args)
+        except Exception as error:
+            self.error = error
+        finally:
+            self.done.set()
+
+
+class WorkerPool(object):
+    '''Bounded pool of daemon threads running tasks.
+
+    `size` maximum number of threads, started as tasks are submitted.
+
+    `queue_size` maximum number of tasks waiting for a thread, unbounded if
+    None. Tasks submitted while the queue is full fail right away with
+    :exc:`QueueFullError`.
+
+    '''
+
+    def __init__(self, size, queue_size=None):
+        '''Initialise pool.'''
+        self.size = size
+        self._queue = queue.Queue(queue_size or 0)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, callback, *args, **kwargs):
+        '''Return :class:`Task` calling *callback* with *args* on a worker.
+
+        Pass *deadline* to drop the task if it is not started in time.
+        '''
+        task = Task(callback, args, deadline=kwargs.get('deadline'))
+        try:
+            self._queue.put_nowait(task)
+        except queue.Full:
+            task.error = QueueFullError('Worker pool queue is full.')
+            task.done.set()
+            return task
+
+        with self._lock:
+            if len(self._threads) < self.size:
+                thread = threading.Thread(target=self._work)
+                thread.daemon = True
+                self._threads.append(thread)
+                thread.start()
+
+        return task
+
+    def _work(self):
+        '''Run tasks from the queue.'''
+        while True:
+            self._queue.get().run()
+
+
+class DiscoverDispatcher(object):
+    '''Evaluate discover of all actions of a session in parallel.
+
+    `session` a ftrack_api.Session instance the actions are registered with.
+
+    `queue_size` maximum number of discovers waiting for a worker.
+
+    A single subscription to the discover topic replies with the items of
+    all actions which replied within their `parallel_discover_timeout`. The
+    pool grows to the largest `parallel_discover_workers` of the added
+    actions. Discovers not started within their timeout are dropped, and
+    each runs with a session of its own worker, see
+    :class:`~ftrack_action_handler.sessions.WorkerSessions`.
+
+    '''
+
+    def __init__(self, session, queue_size=1000):
+        '''Initialise dispatcher.'''
+        self.logger = logging.getLogger(
+            '{0}.{1}'.format(__name__, self.__class__.__name__)
+        )
+        self.session = session
+        self.actions = []
+        self.late = 0
+
+        self._pool = WorkerPool(1, queue_size=queue_size)
+        self._lock = threading.Lock()
+        self._subscription = None
+
+    def add(self, action):
+        '''Add *action*, subscribing to the discover topic if needed.'''
+        with self._lock:
+            if action not in self.actions:
+                self.actions.append(action)
+
+            self._pool.size = max(
+                self._pool.size, action.parallel_discover_workers
+            )
+
+            if self._subscription is None:
+                self._subscription = self.session.event_hub.subscribe(
+                    'topic=ftrack.action.discover', self._handle
+                )
+
+    def remove(self, action):
+        '''Remove *action*, unsubscribing if no actions are left.'''
+        with self._lock:
+            if action in self.actions:
+                self.actions.remove(action)
+
+            if not self.actions and self._subscription is not None:
+                self.session.event_hub.unsubscribe(self._subscription)
+                self._subscription = None
+
+    def _handle(self, event):
+        '''Return items of all actions discovered for *event*.'''
+        with self._lock:
+            actions = list(self.actions)
+
+        start = time.time()
+        tasks = []
+        for action in actions:
+            deadline = None
+            if action.parallel_discover_timeout is not None:
+                deadline = start + action.parallel_discover_timeout
+
+            tasks.append((
+                action,
+                deadline,
+                self._pool.submit(
+                    action._in_worker, action._handle_discover, event,
+                    deadline=deadline
+                )
+            ))
+
+        items = []
+        for action, deadline, task in tasks:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0, deadline - time.time())
+
+            if not task.done.wait(remaining):
+                self.late += 1
+                self.logger.warning(
+                    'Discover {0} of {1} did not finish within {2}s.'.format(
+                        event.get('id'), action.identifier,
+                        action.parallel_discover_timeout
+                    )
+                )
+                continue
+
+            if task.error is not None:
+                if isinstance(task.error, (QueueFullError, TaskExpiredError)):
+                    self.late += 1
+
+                self.logger.error(
+                    'Discover {0} of {1} failed: {2}'.format(
+                        event.get('id'), action.identifier, task.error
+                    )
+                )
+                continue
+
+            if task.result:
+                items.extend(task.result.get('items', []))
+
+        if items:
+            return {
+                'items': items
+            }
+
+
+_dispatchers = weakref.WeakKeyDictionary()
+_dispatchers_lock = threading.Lock()
+
+
+def dispatcher(session):
+    '''Return :class:`DiscoverDispatcher` shared by actions of *session*.'''
+    with _dispatchers_lock:
+        result = _dispatchers.get(session)
+        if result is None:
+            result = DiscoverDispatcher(session)
+            _dispatchers[session] = result
+
+    return result
@@ -0,0 +1,184 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import collections
+import json
+import logging
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    # Python 2.
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+
+logger = logging.getLogger(__name__)
+
+
+class Statistics(object):
+    '''Collect rates and latencies of action callbacks.
+
+    `window` number of seconds rates and latencies are computed over.
+
+    '''
+
+    def __init__(self, window=60):
+        '''Initialise statistics.'''
+        self.window = window
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._in_flight = collections.Counter()
+        self._totals = collections.Counter()
+        self._errors = collections.Counter()
+
+    def __call__(self, name, identifier, callback, event):
+        '''Call *callback* with *event*, recording its duration.'''
+        key = (identifier, name)
+        with self._lock:
+            self._in_flight[key] += 1
+
+        start = time.time()
+        try:
+            return callback(event)
+
+        except Exception:
+            with self._lock:
+                self._errors[key] += 1
+            raise
+
+        finally:
+            end = time.time()
+            with self._lock:
+                self._in_flight[key] -= 1
+                self._totals[key] += 1
+                calls = self._calls.setdefault(key, collections.deque())
+                calls.append((end, end - start))
+                self._expire(calls, end)
+
+    def _expire(self, calls, now):
+        '''Remove *calls* older than the window.'''
+        while calls and calls[0][0] < now - self.window:
+            calls.popleft()
+
+    def report(self):
+        '''Return dictionary of statistics per action identifier.'''
+        now = time.time()
+        report = {}
+        with self._lock:
+            keys = set(self._calls) | set(self._in_flight)
+            for identifier, name in keys:
+                calls = self._calls.get((identifier, name), collections.deque())
+                self._expire(calls, now)
+                durations = sorted(duration for _, duration in calls)
+
+                statistics = {
+                    'total': self._totals[(identifier, name)],
+                    'errors': self._errors[(identifier, name)],
+                    'in_flight': self._in_flight[(identifier, name)],
+                    'rate': len(durations) / float(self.window),
+                    'latency': None
+                }
+                if durations:
+                    statistics['latency'] = {
+                        'mean': sum(durations) / len(durations),
+                        'p50': durations[int(len(durations) * 0.5)],
+                        'p99': durations[
+                            min(len(durations) - 1, int(len(durations) * 0.99))
+                        ],
+                        'max': durations[-1]
+                    }
+
+                report.setdefault(identifier, {})[name] = statistics
+
+        return report
+
+
+#: Statistics shared by all actions in the process.
+statistics = Statistics()
+
+
+class HealthServer(HTTPServer):
+    '''HTTP server reporting the health of the actions in the process.'''
+
+    def __init__(self, address):
+        '''Initialise server listening on *address*.'''
+        HTTPServer.__init__(self, address, _HealthRequestHandler)
+        self.sessions = []
+        self.started = time.time()
+
+    def report(self):
+        '''Return tuple of health status and report dictionary.'''
+        hubs = []
+        for session in self.sessions:
+            event_hub = session.event_hub
+            queue = getattr(event_hub, '_event_queue', None)
+            hubs.append({
+                'server_url': session.server_url,
+                'connected': event_hub.connected,
+                'queued': queue.qsize() if queue is not None else None
+            })
+
+        healthy = all(hub['connected'] for hub in hubs)
+        return healthy, {
+            'alive': True,
+            'status': 'ok' if healthy else 'disconnected',
+            'uptime': time.time() - self.started,
+            'event_hubs': hubs,
+            'actions': statistics.report()
+        }
+
+
+class _HealthRequestHandler(BaseHTTPRequestHandler):
+    '''Serve health report as JSON.'''
+
+    def do_GET(self):
+        '''Respond with the health report.'''
+        if self.path.split('?')[0] not in ('/', '/health'):
+            self.send_error(404)
+            return
+
+        healthy, report = self.server.report()
+        body = json.dumps(report).encode('utf-8')
+
+        self.send_response(200 if healthy else 503)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        '''Log requests at debug level instead of writing to stderr.'''
+        logger.debug(format, *args)
+
+
+_servers = {}
+_servers_lock = threading.Lock()
+
+
+def serve(session, port, host='127.0.0.1'):
+    '''Return health server on *host* and *port* reporting on *session*.
+
+    The server is started in a background thread the first time it is
+    requested, later calls add *session* to the running server.
+
+    '''
+    with _servers_lock:
+        server = _servers.get((host, port))
+        if server is None:
+            server = HealthServer((host, port))
+            thread = threading.Thread(target=server.serve_forever)
+            thread.daemon = True
+            thread.start()
+            _servers[(host, port)] = server
+            logger.info(
+                'Serving action health on http://{0}:{1}/health'.format(
+                    host, server.server_address[1]
+                )
+            )
+
+        if session not in server.sessions:
+            server.sessions.append(session)
+
+    return server
@@ -0,0 +1,118 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import logging
+
+try:
+    import tracemalloc
+except ImportError:
+    # Not available on Python 2.
+    tracemalloc = None
+
+
+class CacheScope(object):
+    '''Context manager scoping the cache of a session to a block of work.
+
+    `session` a ftrack_api.Session instance whose cache is scoped.
+
+    `release` remove the entries added to the cache within the scope when
+    leaving it. Entries are kept if the session has uncommitted operations.
+
+    `fifo_limit` maximum number of entries to keep in the cache. Entries are
+    removed in the order they were added to the cache when leaving the scope,
+    first in first out, regardless of how recently they were read. Entries
+    read by every launch, such as the action user, are added again by the
+    next launch that needs them.
+
+    After leaving the scope :attr:`added`, :attr:`released` and :attr:`size`
+    hold the number of cache entries added within the scope, removed when
+    leaving it and left in the cache. :attr:`allocated` holds the memory in
+    bytes allocated within the scope if tracemalloc is tracing, otherwise
+    None.
+
+    The cache is compared on entering and leaving the scope, so the session
+    should only be used by the scoped work meanwhile, entries added by other
+    threads using the same session are released too.
+
+    '''
+
+    def __init__(self, session, release=True, fifo_limit=None):
+        '''Initialise scope.'''
+        self.logger = logging.getLogger(
+            '{0}.{1}'.format(__name__, self.__class__.__name__)
+        )
+        self.session = session
+        self.release = release
+        self.fifo_limit = fifo_limit
+
+        self.added = 0
+        self.released = 0
+        self.size = 0
+        self.allocated = None
+
+        self._keys = set()
+        self._traced = None
+
+    def __enter__(self):
+        '''Record the cache content on entering the scope.'''
+        self._keys = set(self._cache_keys())
+        if tracemalloc is not None and tracemalloc.is_tracing():
+            self._traced = tracemalloc.get_traced_memory()[0]
+
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        '''Release cache entries added within the scope.'''
+        cache = self.session.cache
+        keys = self._cache_keys()
+        added = [key for key in keys if key not in self._keys]
+        self.added = len(added)
+
+        removable = []
+        if len(self.session.recorded_operations):
+            self.logger.debug(
+                'Keeping cache as session has uncommitted operations.'
+            )
+
+        else:
+            if self.release:
+                removable.extend(added)
+
+            if self.fifo_limit is not None:
+                kept = [key for key in keys if key not in removable]
+                overflow = len(kept) - self.fifo_limit
+                if overflow > 0:
+                    removable.extend(kept[:overflow])
+
+        self.released = 0
+        for key in removable:
+            try:
+                cache.remove(key)
+            except KeyError:
+                continue
+
+            self.released += 1
+
+        self.size = len(keys) - self.released
+
+        if self._traced is not None and tracemalloc.is_tracing():
+            self.allocated = tracemalloc.get_traced_memory()[0] - self._traced
+
+        return False
+
+    def _cache_keys(self):
+        '''Return keys of the session cache, oldest first where known.'''
+        cache = self.session.cache
+        layers = getattr(cache, 'caches', None) or [cache]
+
+        keys = []
+        seen = set()
+        for layer in layers:
+            for key in layer.keys():
+                if key in seen:
+                    continue
+
+                seen.add(key)
+                keys.append(key)
+
+        return keys
@@ -0,0 +1,203 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import collections
+import contextlib
+import threading
+import weakref
+
+
+class OperationCounter(object):
+    '''Count server calls and operations made through a session.
+
+    `session` a ftrack_api.Session instance to count calls for.
+
+    `scopes` also count calls in the :class:`OperationScope` instances active
+    in the calling thread. Only the counter returned by :func:`counter` does
+    so, to count each call once.
+
+    All queries, gets, lazy loads and commits of a session go through
+    `Session.call`, which is wrapped while the counter is installed.
+    :attr:`calls` holds the number of server round trips and
+    :attr:`operations` a counter of the batched operations per action type,
+    ie. query, create, update and delete.
+
+    If another wrapper was installed on top when uninstalling, the counter
+    stays in the chain of wrappers but stops counting.
+
+    '''
+
+    def __init__(self, session, scopes=False):
+        '''Initialise counter.'''
+        self.session = session
+        self.scopes = scopes
+        self.calls = 0
+        self.operations = collections.Counter()
+
+        self._lock = threading.Lock()
+        self._installed = False
+        self._call = None
+        self._previous = None
+
+    def install(self):
+        '''Start counting calls made through the session.'''
+        if self._installed:
+            return
+
+        self._installed = True
+        if self._call is not None:
+            # Still wrapped below a later wrapper, resume counting.
+            return
+
+        self._previous = self.session.__dict__.get('call')
+        self._call = self.session.call
+        self.session.call = self._counting_call
+
+    def uninstall(self):
+        '''Stop counting calls made through the session.'''
+        if not self._installed:
+            return
+
+        self._installed = False
+        if self.session.__dict__.get('call') != self._counting_call:
+            # Wrapped by a later wrapper calling this one, keep forwarding.
+            return
+
+        if self._previous is None:
+            del self.session.call
+        else:
+            self.session.call = self._previous
+
+        self._call = None
+        self._previous = None
+
+    def reset(self):
+        '''Reset counts.'''
+        with self._lock:
+            self.calls = 0
+            self.operations = collections.Counter()
+
+    def _counting_call(self, data):
+        '''Count *data* and forward it to the session.'''
+        if self._installed:
+            with self._lock:
+                self.calls += 1
+                for operation in data:
+                    self.operations[operation.get('action')] += 1
+
+            if self.scopes:
+                for scope in active():
+                    scope.add(data)
+
+        return self._call(data)
+
+    def __enter__(self):
+        '''Install counter.'''
+        self.install()
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        '''Uninstall counter.'''
+        self.uninstall()
+        return False
+
+
+class BudgetExceededError(RuntimeError):
+    '''Raise when server operations exceed the budget of a scope.'''
+
+
+_local = threading.local()
+_counters = weakref.WeakKeyDictionary()
+_counters_lock = threading.Lock()
+
+
+def active():
+    '''Return list of operation scopes active in the current thread.'''
+    return list(getattr(_local, 'scopes', []))
+
+
+@contextlib.contextmanager
+def activated(scopes):
+    '''Activate *scopes* in the current thread, ie. a worker thread.'''
+    previous = active()
+    _local.scopes = previous + list(scopes)
+    try:
+        yield
+    finally:
+        _local.scopes = previous
+
+
+def counter(session):
+    '''Return installed :class:`OperationCounter` shared by users of *session*.
+
+    The counter also counts operations in the active scopes.
+    '''
+    with _counters_lock:
+        result = _counters.get(session)
+        if result is None:
+            result = _counters[session] = OperationCounter(session, scopes=True)
+
+        result.install()
+
+    return result
+
+
+class OperationScope(object):
+    '''Count server operations made by the current thread while active.
+
+    Operations are only counted for sessions passed to :func:`counter`.
+
+    `limit` number of operations allowed within the scope, unlimited if None.
+
+    `strict` raise :exc:`BudgetExceededError` instead of making operations
+    exceeding the limit.
+
+    `exceeded` callback called with the scope once the limit is exceeded.
+
+    '''
+
+    def __init__(self, limit=None, strict=False, exceeded=None):
+        '''Initialise scope.'''
+        self.limit = limit
+        self.strict = strict
+        self.exceeded = exceeded
+
+        self.calls = 0
+        self.operations = collections.Counter()
+        self.over_budget = False
+
+    @property
+    def total(self):
+        '''Return total number of operations counted.'''
+        return sum(self.operations.values())
+
+    def add(self, data):
+        '''Count operations in *data* sent to the server.'''
+        self.calls += 1
+        for operation in data:
+            self.operations[operation.get('action')] += 1
+
+        if self.limit is None or self.total <= self.limit:
+            return
+
+        if not self.over_budget:
+            self.over_budget = True
+            if self.exceeded is not None:
+                self.exceeded(self)
+
+        if self.strict:
+            raise BudgetExceededError(
+                '{0} server operations exceed the budget of {1}.'.format(
+                    self.total, self.limit
+                )
+            )
+
+    def __enter__(self):
+        '''Activate scope in the current thread.'''
+        _local.scopes = active() + [self]
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        '''Deactivate scope.'''
+        _local.scopes = [scope for scope in active() if scope is not self]
+        return False
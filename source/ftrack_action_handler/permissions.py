@@ -0,0 +1,171 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import threading
+import time
+import weakref
+
+from ftrack_action_handler.registry import registered
+
+
+def names(values):
+    '''Return *values* formatted as names for use in a query expression.'''
+    return ', '.join('"{0}"'.format(value) for value in sorted(values))
+
+
+def is_group_member(session, username, groups):
+    '''Return whether user *username* is a member of any of *groups*.'''
+    return session.query(
+        'select id from Membership where user.username is "{0}"'
+        ' and group.name in ({1})'.format(username, names(groups))
+    ).first() is not None
+
+
+def has_security_role(session, username, roles):
+    '''Return whether user *username* has any of the security *roles*.'''
+    return session.query(
+        'select id from UserSecurityRole where user.username is "{0}"'
+        ' and security_role.name in ({1})'.format(username, names(roles))
+    ).first() is not None
+
+
+class Members(object):
+    '''Members of the groups or security roles actions of a session allow.
+
+    `session` a ftrack_api.Session instance the actions are registered with.
+
+    The members of the names in the :attr:`attribute` filter of all actions
+    registered with the session are queried together, with a single query
+    per refresh, and shared by the actions.
+
+    '''
+
+    #: Action attribute holding the allowed names.
+    attribute = None
+
+    def __init__(self, session):
+        '''Initialise members.'''
+        self.session = session
+
+        self._lock = threading.Lock()
+        self._members = {}
+        self._refreshed = None
+
+    def names(self):
+        '''Return set of names allowed by actions registered with the session.'''
+        result = set()
+        for action in list(registered):
+            if action._session is self.session:
+                result.update(getattr(action, self.attribute, None) or [])
+
+        return result
+
+    def is_member(self, username, names, interval, session=None):
+        '''Return whether user *username* is a member of any of *names*.
+
+        Members are queried again if older than *interval* seconds, with
+        *session* if given, as in :meth:`refresh`.
+        '''
+        names = set(names)
+        with self._lock:
+            expired = (
+                self._refreshed is None or
+                time.time() - self._refreshed >= interval
+            )
+            if expired or not names.issubset(self._members):
+                queried = names | self.names()
+                if not expired:
+                    # Keep names queried before until the members expire.
+                    queried.update(self._members)
+
+                self._refresh(queried, session)
+
+            return any(
+                username in self._members.get(name, ()) for name in names
+            )
+
+    def refresh(self, names=(), session=None):
+        '''Query members of *names* and the names allowed by the actions.
+
+        *session* is used for the query if given, ie. one owned by the
+        calling thread, otherwise the session of the actions.
+        '''
+        with self._lock:
+            self._refresh(set(names) | self.names(), session)
+
+    def _refresh(self, names, session=None):
+        '''Query members of *names*.'''
+        members = dict((name, set()) for name in names)
+        if names:
+            members.update(self._query(session or self.session, names))
+
+        self._members = members
+        self._refreshed = time.time()
+
+    def _query(self, session, allowed):
+        '''Return dictionary of usernames per name in *allowed*.'''
+        raise NotImplementedError()
+
+
+class GroupMembers(Members):
+    '''Members of the groups the actions of a session are allowed for.'''
+
+    attribute = 'allowed_groups'
+
+    def _query(self, session, allowed):
+        '''Return dictionary of usernames per group in *allowed*.'''
+        members = {}
+        for group in session.query(
+            'select name, memberships.user.username from Group'
+            ' where name in ({0})'.format(names(allowed))
+        ):
+            members[group['name']] = set(
+                membership['user']['username']
+                for membership in group['memberships']
+            )
+
+        return members
+
+
+class RoleMembers(Members):
+    '''Users with the security roles the actions of a session are allowed for.'''
+
+    attribute = 'allowed_roles'
+
+    def _query(self, session, allowed):
+        '''Return dictionary of usernames per security role in *allowed*.'''
+        members = {}
+        for user_role in session.query(
+            'select user.username, security_role.name from UserSecurityRole'
+            ' where security_role.name in ({0})'.format(names(allowed))
+        ):
+            members.setdefault(user_role['security_role']['name'], set()).add(
+                user_role['user']['username']
+            )
+
+        return members
+
+
+_members = weakref.WeakKeyDictionary()
+_members_lock = threading.Lock()
+
+
+def _shared(session, members_class):
+    '''Return instance of *members_class* shared by actions of *session*.'''
+    with _members_lock:
+        shared = _members.setdefault(session, {})
+        members = shared.get(members_class)
+        if members is None:
+            members = shared[members_class] = members_class(session)
+
+    return members
+
+
+def group_members(session):
+    '''Return :class:`GroupMembers` shared by actions of *session*.'''
+    return _shared(session, GroupMembers)
+
+
+def role_members(session):
+    '''Return :class:`RoleMembers` shared by actions of *session*.'''
+    return _shared(session, RoleMembers)
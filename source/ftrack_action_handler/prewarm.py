@@ -0,0 +1,115 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import logging
+import threading
+import weakref
+
+from ftrack_action_handler import permissions
+from ftrack_action_handler import sessions
+
+
+class Prewarmer(object):
+    '''Warm session caches used by actions in a background thread.
+
+    `session` a ftrack_api.Session instance shared by the actions.
+
+    Builds the entity type table from the session schemas and queries the
+    members of the groups and security roles the actions added with
+    :meth:`add` filter on into the members shared by the actions, see
+    :func:`~ftrack_action_handler.permissions.group_members`. Actions
+    checking members on every discover, with `member_refresh_interval` set
+    to None, have no members to warm. :attr:`ready` is set once all added
+    actions are warmed.
+
+    '''
+
+    def __init__(self, session):
+        '''Initialise prewarmer.'''
+        self.logger = logging.getLogger(
+            '{0}.{1}'.format(__name__, self.__class__.__name__)
+        )
+        self.session = session
+        self.ready = threading.Event()
+
+        self._lock = threading.Lock()
+        self._pending = []
+        self._thread = None
+        self._schemas = False
+
+    def add(self, action):
+        '''Warm caches used by *action* in the background.'''
+        with self._lock:
+            self._pending.append(action)
+            self.ready.clear()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _run(self):
+        '''Warm caches until no actions are pending.'''
+        while True:
+            with self._lock:
+                actions = self._pending
+                self._pending = []
+                if not actions:
+                    self._thread = None
+                    self.ready.set()
+                    return
+
+            try:
+                self._warm(actions)
+            except Exception:
+                self.logger.exception('Prewarming caches failed.')
+
+    def _warm(self, actions):
+        '''Warm caches used by *actions*.'''
+        if not self._schemas:
+            actions[0]._entity_type_table()
+            self._schemas = True
+
+        groups = set()
+        roles = set()
+        for action in actions:
+            if getattr(action, 'member_refresh_interval', None) is None:
+                continue
+
+            groups.update(getattr(action, 'allowed_groups', None) or [])
+            roles.update(getattr(action, 'allowed_roles', None) or [])
+
+        # Query with a worker session, the event hub thread uses the shared one.
+        with sessions.worker_sessions(self.session).acquire() as session:
+            if groups:
+                permissions.group_members(self.session).refresh(
+                    groups, session
+                )
+
+            if roles:
+                permissions.role_members(self.session).refresh(
+                    roles, session
+                )
+
+        self.logger.debug(
+            'Prewarmed caches for {0}.'.format(', '.join(map(str, actions)))
+        )
+
+
+_prewarmers = weakref.WeakKeyDictionary()
+_prewarmers_lock = threading.Lock()
+
+
+def prewarm(action):
+    '''Warm caches used by *action* in the background, return ready event.
+
+    Actions sharing a session share a single :class:`Prewarmer`.
+
+    '''
+    with _prewarmers_lock:
+        prewarmer = _prewarmers.get(action.session)
+        if prewarmer is None:
+            prewarmer = Prewarmer(action.session)
+            _prewarmers[action.session] = prewarmer
+
+    prewarmer.add(action)
+    return prewarmer.ready
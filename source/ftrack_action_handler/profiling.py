@@ -0,0 +1,142 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    # Not available on Python 2.
+    tracemalloc = None
+
+
+# Only one call is profiled at a time, cProfile refuses to enable while
+# another profile is active and tracemalloc is shared by the process.
+_profiling = threading.Lock()
+
+
+class Profiler(object):
+    '''Sample and profile action callbacks.
+
+    `sample_rate` fraction of invocations to profile, between 0 and 1.
+
+    `threshold` minimum duration in seconds for a sampled profile to be
+    written to disk.
+
+    `directory` where profiles are written, defaults to the current
+    working directory.
+
+    `trace_memory` also record memory allocations using tracemalloc.
+
+    '''
+
+    def __init__(
+        self, sample_rate=0.0, threshold=1.0, directory=None,
+        trace_memory=True
+    ):
+        '''Initialise profiler.'''
+        self.logger = logging.getLogger(
+            '{0}.{1}'.format(__name__, self.__class__.__name__)
+        )
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.directory = directory or os.getcwd()
+        self.trace_memory = trace_memory and tracemalloc is not None
+
+    def __call__(self, name, identifier, callback, event):
+        '''Call *callback* with *event*, profiling a sample of invocations.
+
+        *name* is a short label for the callback, ie. discover or launch, and
+        *identifier* the identifier of the action it belongs to. Both are used
+        together with the event id to name the written profile.
+
+        '''
+        if random.random() >= self.sample_rate:
+            return callback(event)
+
+        if not _profiling.acquire(False):
+            # Another call is being profiled, run this one unprofiled.
+            return callback(event)
+
+        try:
+            return self._profile(name, identifier, callback, event)
+        finally:
+            _profiling.release()
+
+    def _profile(self, name, identifier, callback, event):
+        '''Call *callback* with *event* under cProfile and tracemalloc.'''
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiling tool is active in this thread.
+            self.logger.debug('Profiler unavailable, not profiling.')
+            return callback(event)
+
+        started_tracing = False
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+
+        start = time.time()
+        try:
+            return callback(event)
+        finally:
+            profile.disable()
+            duration = time.time() - start
+            try:
+                snapshot = None
+                if self.trace_memory and tracemalloc.is_tracing():
+                    snapshot = tracemalloc.take_snapshot()
+
+                if duration >= self.threshold:
+                    self._write(
+                        name, identifier, event, duration, profile, snapshot
+                    )
+
+            except Exception:
+                self.logger.exception(
+                    'Unable to profile {0} of {1}.'.format(name, identifier)
+                )
+
+            finally:
+                if started_tracing:
+                    tracemalloc.stop()
+
+    def _write(self, name, identifier, event, duration, profile, snapshot):
+        '''Write *profile* and memory *snapshot* to disk.'''
+        filename = re.sub(
+            r'[^\w.-]', '_', '{0}_{1}_{2}_{3}'.format(
+                identifier, name, event.get('id'), int(time.time() * 1000)
+            )
+        )
+        path = os.path.join(self.directory, filename)
+
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+
+            profile.dump_stats(path + '.prof')
+
+            if snapshot is not None:
+                with open(path + '.memory.txt', 'w') as memory_file:
+                    for statistic in snapshot.statistics('lineno')[:50]:
+                        memory_file.write('{0}\n'.format(statistic))
+
+        except (IOError, OSError):
+            self.logger.exception(
+                'Unable to write profile to {0}.'.format(path)
+            )
+            return
+
+        self.logger.warning(
+            '{0} of {1} took {2:.3f}s, profile written to {3}.prof'.format(
+                name, identifier, duration, path
+            )
+        )
@@ -0,0 +1,8 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import weakref
+
+
+#: Actions currently registered with an event hub.
+registered = weakref.WeakSet()
@@ -0,0 +1,184 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import hashlib
+import logging
+import os
+import sys
+import threading
+
+try:
+    import importlib.util
+except ImportError:
+    # Python 2.
+    import imp
+    importlib = None
+
+from ftrack_action_handler.action import base
+
+
+class Reloader(object):
+    '''Load action plugins and reload them when their files change.
+
+    `session` a ftrack_api.Session instance the actions are registered with.
+
+    `paths` list of plugin files or directories containing plugin files. As
+    with ftrack plugins, each file defines a `register(session, **kw)`
+    function registering its actions.
+
+    `interval` seconds between checks for changed files.
+
+    `drain_timeout` seconds to wait for launches of replaced actions to
+    finish, indefinitely if None.
+
+    The actions a plugin registered are retired while the reloaded plugin
+    registers its actions, so each event is handled by either the old or the
+    new actions only, then unregistered once their launches finished.
+    Reloaded actions find the interface and discover values cached by their
+    predecessors in the cache shared by the actions of the session.
+
+    '''
+
+    def __init__(self, session, paths, interval=1.0, drain_timeout=60):
+        '''Initialise reloader.'''
+        self.logger = logging.getLogger(
+            '{0}.{1}'.format(__name__, self.__class__.__name__)
+        )
+        self.session = session
+        self.paths = paths
+        self.interval = interval
+        self.drain_timeout = drain_timeout
+
+        self._modified = {}
+        self._actions = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def files(self):
+        '''Return list of plugin files found in :attr:`paths`.'''
+        files = []
+        for path in self.paths:
+            if os.path.isdir(path):
+                for name in sorted(os.listdir(path)):
+                    if name.endswith('.py') and not name.startswith('_'):
+                        files.append(os.path.join(path, name))
+
+            elif os.path.isfile(path):
+                files.append(path)
+
+        return [os.path.abspath(path) for path in files]
+
+    def start(self):
+        '''Load all plugins and watch them for changes in a background thread.'''
+        self.check()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        '''Stop watching for changes.'''
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        '''Check for changes every :attr:`interval` until stopped.'''
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                self.logger.exception('Checking plugins for changes failed.')
+
+    def check(self):
+        '''Load new and reload changed plugins, unload removed plugins.'''
+        files = self.files()
+        for path in files:
+            try:
+                modified = os.path.getmtime(path)
+            except OSError:
+                continue
+
+            if self._modified.get(path) != modified:
+                self._modified[path] = modified
+                self.reload(path)
+
+        for path in list(self._modified):
+            if path not in files:
+                del self._modified[path]
+                self._unregister(self._actions.pop(path, []))
+
+    def reload(self, path):
+        '''Import plugin at *path* and replace the actions it registered.
+
+        The actions previously registered by the plugin are kept if the
+        plugin fails to import or register.
+        '''
+        try:
+            module = self._import(path)
+        except Exception:
+            self.logger.exception('Unable to import plugin {0}.'.format(path))
+            return
+
+        register = getattr(module, 'register', None)
+        if register is None:
+            self.logger.debug('Ignoring {0} without register.'.format(path))
+            return
+
+        # Retire the previous actions while the new ones register, so events
+        # arriving meanwhile are not handled by both.
+        previous = self._actions.get(path, [])
+        for action in previous:
+            action.retired = True
+
+        before = set(base.registered)
+        try:
+            register(self.session)
+
+        except Exception:
+            self.logger.exception(
+                'Unable to register plugin {0}, keeping previous '
+                'actions.'.format(path)
+            )
+            for action in set(base.registered) - before:
+                action.unregister(timeout=0)
+
+            for action in previous:
+                action.retired = False
+
+            return
+
+        self._actions[path] = list(set(base.registered) - before)
+        self.logger.info(
+            'Loaded {0} registering {1}.'.format(path, self._actions[path])
+        )
+
+        # Let replaced actions finish their launches.
+        self._unregister(previous)
+
+    def _unregister(self, actions):
+        '''Unregister *actions*, waiting for their launches to finish.'''
+        for action in actions:
+            if not action.unregister(timeout=self.drain_timeout):
+                self.logger.warning(
+                    'Launches of {0} did not finish within {1}s.'.format(
+                        action, self.drain_timeout
+                    )
+                )
+
+    def _import(self, path):
+        '''Import and return module at *path*.'''
+        name = 'ftrack_action_plugin_{0}'.format(
+            hashlib.md5(path.encode('utf-8')).hexdigest()
+        )
+
+        if importlib is None:
+            return imp.load_source(name, path)
+
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules[name] = module
+        return module
@@ -0,0 +1,587 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import collections
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+
+import ftrack_api
+import ftrack_api.cache
+
+from ftrack_action_handler.dispatch import WorkerPool
+from ftrack_action_handler import operations
+
+
+#: Keys whose values are replaced when recording events.
+REDACTED_FIELDS = (
+    'apiKey', 'api_key', 'password', 'secret', 'token'
+)
+
+
+def redact(data, fields=REDACTED_FIELDS):
+    '''Return copy of *data* with values of keys in *fields* redacted.'''
+    if isinstance(data, dict):
+        return dict(
+            (
+                key,
+                '<redacted>' if key in fields else redact(value, fields)
+            )
+            for key, value in data.items()
+        )
+
+    if isinstance(data, (list, tuple)):
+        return [redact(value, fields) for value in data]
+
+    return data
+
+
+def percentile(values, fraction):
+    '''Return *fraction* percentile of sorted *values* by nearest rank.'''
+    if not values:
+        return None
+
+    index = max(0, min(len(values) - 1, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+class Recorder(object):
+    '''Record events handled by actions to a JSON lines file.
+
+    `path` the file records are appended to.
+
+    `fields` keys whose values are redacted from the recorded events.
+
+    '''
+
+    def __init__(self, path, fields=REDACTED_FIELDS):
+        '''Initialise recorder.'''
+        self.logger = logging.getLogger(
+            '{0}.{1}'.format(__name__, self.__class__.__name__)
+        )
+        self.path = path
+        self.fields = fields
+        self._lock = threading.Lock()
+
+    def __call__(self, name, identifier, callback, event):
+        '''Call *callback* with *event* and record it with its duration.'''
+        start = time.time()
+        try:
+            return callback(event)
+        finally:
+            self.record(name, identifier, event, start, time.time() - start)
+
+    def record(self, name, identifier, event, start, duration):
+        '''Append *event* handled by *name* of action *identifier*.'''
+        record = {
+            'name': name,
+            'identifier': identifier,
+            'time': start,
+            'duration': duration,
+            'event': redact(dict(event), self.fields)
+        }
+
+        line = json.dumps(record, default=str)
+        with self._lock:
+            try:
+                with open(self.path, 'a') as record_file:
+                    record_file.write(line + '\n')
+            except (IOError, OSError):
+                self.logger.exception(
+                    'Unable to record event to {0}.'.format(self.path)
+                )
+
+
+class _StandInEntity(dict):
+    '''Entity of a :class:`StandInSession`, recording changes as operations.'''
+
+    def __init__(self, session, entity_type, data):
+        '''Initialise entity of *entity_type* with *data*.'''
+        super(_StandInEntity, self).__init__(data)
+        self.session = session
+        self.entity_type = entity_type
+        self.setdefault('id', str(uuid.uuid4()))
+
+    def __setitem__(self, key, value):
+        '''Set *key* to *value*, recording an update operation.'''
+        self.session._record_update(self, key, value)
+        super(_StandInEntity, self).__setitem__(key, value)
+
+    def update(self, *args, **kwargs):
+        '''Update entity, recording an update operation per key.'''
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+
+class _StandInQueryResult(object):
+    '''Result of a query made through a :class:`StandInSession`.'''
+
+    def __init__(self, entities):
+        '''Initialise result holding *entities*.'''
+        self._entities = entities
+
+    def __iter__(self):
+        '''Iterate over entities.'''
+        return iter(self._entities)
+
+    def __len__(self):
+        '''Return number of entities.'''
+        return len(self._entities)
+
+    def all(self):
+        '''Return list of all entities.'''
+        return list(self._entities)
+
+    def first(self):
+        '''Return first entity or None.'''
+        return self._entities[0] if self._entities else None
+
+    def one(self):
+        '''Return single entity, raise if there is not exactly one.'''
+        if not self._entities:
+            raise ftrack_api.exception.NoResultFoundError()
+
+        if len(self._entities) > 1:
+            raise ftrack_api.exception.MultipleResultsFoundError()
+
+        return self._entities[0]
+
+
+class _StandInEventHub(object):
+    '''Event hub of a :class:`StandInSession`, collecting published events.'''
+
+    connected = False
+
+    def __init__(self):
+        '''Initialise event hub.'''
+        self.subscriptions = {}
+        self.published = []
+        self.replies = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, subscription, callback, subscriber=None, priority=100):
+        '''Add *callback* for *subscription* and return its identifier.'''
+        identifier = str(uuid.uuid4())
+        with self._lock:
+            self.subscriptions[identifier] = (subscription, callback)
+
+        return identifier
+
+    def unsubscribe(self, subscriber_identifier):
+        '''Remove subscription with *subscriber_identifier*.'''
+        with self._lock:
+            del self.subscriptions[subscriber_identifier]
+
+    def publish(self, event, synchronous=False, on_reply=None, on_error='raise'):
+        '''Collect published *event*.'''
+        with self._lock:
+            self.published.append(event)
+
+    def publish_reply(self, source_event, data, source=None):
+        '''Collect reply *data* to *source_event*.'''
+        with self._lock:
+            self.replies.append((source_event, data))
+
+    def wait(self, duration=None):
+        '''Return right away, there are no events to wait for.'''
+
+
+class StandInSession(object):
+    '''Local stand-in for a ftrack_api.Session, never reaching a server.
+
+    `entities` mapping of entity type to a list of dictionaries answering the
+    queries and gets of that type, each given an `id` if missing.
+
+    `schemas` list of schemas used by the actions to translate entity types,
+    ie. the schemas of the session the events were recorded with.
+
+    `server_url` reported to the actions, keeping their cache entries apart
+    from those of real servers.
+
+    Queries, gets and commits go through :meth:`call`, which records each
+    call in :attr:`calls` and answers it from the local entities. Query
+    conditions joined by `and` using `is`, `is_not`, `in` and `not_in` are
+    evaluated, other conditions are ignored. Replies published by the actions
+    are collected on :attr:`event_hub`. The stand-in is safe to use from
+    several threads at once and shared with worker threads.
+
+    '''
+
+    #: Shared with worker threads instead of creating sessions per worker.
+    thread_safe = True
+
+    def __init__(self, entities=None, schemas=None, server_url=None):
+        '''Initialise stand-in session.'''
+        self.server_url = server_url or 'http://replay.localhost'
+        self.api_key = None
+        self.api_user = 'replay'
+        self.schemas = list(schemas or [])
+        self.cache = ftrack_api.cache.MemoryCache()
+        self.event_hub = _StandInEventHub()
+        self.recorded_operations = []
+        self.calls = []
+
+        self._lock = threading.RLock()
+        self._undo = []
+        self._entities = {}
+        for entity_type, items in (entities or {}).items():
+            self._entities[entity_type] = [
+                _StandInEntity(self, entity_type, item) for item in items
+            ]
+
+    def query(self, expression):
+        '''Return result of query *expression*.'''
+        result = self.call([{'action': 'query', 'expression': expression}])
+        return _StandInQueryResult(result[0]['data'])
+
+    def get(self, entity_type, entity_key):
+        '''Return entity of *entity_type* with id *entity_key* or None.'''
+        return self.query(
+            'select id from {0} where id is "{1}"'.format(
+                entity_type, entity_key
+            )
+        ).first()
+
+    def create(self, entity_type, data=None):
+        '''Return new entity of *entity_type* with *data*, added on commit.'''
+        entity = _StandInEntity(self, entity_type, data or {})
+        with self._lock:
+            self.recorded_operations.append({
+                'action': 'create',
+                'entity_type': entity_type,
+                'entity_key': [entity['id']],
+                'entity_data': dict(entity),
+                'entity': entity
+            })
+
+        return entity
+
+    def delete(self, entity):
+        '''Delete *entity* on commit.'''
+        with self._lock:
+            self.recorded_operations.append({
+                'action': 'delete',
+                'entity_type': entity.entity_type,
+                'entity_key': [entity['id']],
+                'entity': entity
+            })
+
+    def commit(self):
+        '''Send recorded operations through :meth:`call`.'''
+        with self._lock:
+            pending = list(self.recorded_operations)
+            del self.recorded_operations[:]
+            del self._undo[:]
+
+        if pending:
+            self.call(pending)
+
+    def rollback(self):
+        '''Discard recorded operations, restoring updated values.'''
+        with self._lock:
+            for entity, key, value, existed in reversed(self._undo):
+                if existed:
+                    dict.__setitem__(entity, key, value)
+                else:
+                    dict.pop(entity, key, None)
+
+            del self.recorded_operations[:]
+            del self._undo[:]
+
+    def call(self, data):
+        '''Record call with operations *data* and answer it locally.'''
+        with self._lock:
+            self.calls.append(data)
+            return [self._answer(operation) for operation in data]
+
+    def _answer(self, operation):
+        '''Return local result of *operation*.'''
+        action = operation.get('action')
+        if action == 'query':
+            return {
+                'action': action,
+                'data': self._match(operation['expression']),
+                'metadata': {}
+            }
+
+        entity = operation.get('entity')
+        if action == 'create':
+            self._entities.setdefault(operation['entity_type'], []).append(
+                entity
+            )
+
+        elif action == 'delete':
+            entities = self._entities.get(operation['entity_type'], [])
+            if entity in entities:
+                entities.remove(entity)
+
+        return {'action': action, 'data': {}}
+
+    def _record_update(self, entity, key, value):
+        '''Record update of *key* of *entity* to *value*.'''
+        with self._lock:
+            self._undo.append((entity, key, entity.get(key), key in entity))
+            self.recorded_operations.append({
+                'action': 'update',
+                'entity_type': entity.entity_type,
+                'entity_key': [entity['id']],
+                'entity_data': {key: value}
+            })
+
+    def _match(self, expression):
+        '''Return list of entities matching query *expression*.'''
+        match = re.match(
+            r'\s*(?:select\s+.*?\s+from\s+)?(\w+)'
+            r'(?:\s+where\s+(.*?))?(?:\s+limit\s+\d+)?\s*$',
+            expression, re.IGNORECASE | re.DOTALL
+        )
+        if match is None:
+            raise ValueError('Unsupported query {0!r}.'.format(expression))
+
+        entity_type, where = match.groups()
+        conditions = []
+        for condition in re.split(r'\s+and\s+', where or ''):
+            condition = re.match(
+                r'\s*([\w.]+)\s+(is_not|is|not_in|in)\s+(.+?)\s*$',
+                condition
+            )
+            if condition is not None:
+                conditions.append(condition.groups())
+
+        return [
+            entity for entity in self._entities.get(entity_type, [])
+            if all(
+                self._evaluate(entity, path, operator, value)
+                for path, operator, value in conditions
+            )
+        ]
+
+    def _evaluate(self, entity, path, operator, value):
+        '''Return whether attribute *path* of *entity* matches *value*.'''
+        if value.startswith('('):
+            expected = re.findall(r'"([^"]*)"', value) or [
+                item.strip() for item in value.strip('()').split(',')
+                if item.strip()
+            ]
+        else:
+            expected = [value.strip('"')]
+
+        found = any(
+            '{0}'.format(actual) in expected
+            for actual in _resolve(entity, path.split('.'))
+        )
+        if operator in ('is_not', 'not_in'):
+            return not found
+
+        return found
+
+
+def _resolve(value, path):
+    '''Return list of values found at attribute *path* of *value*.'''
+    if not path:
+        return [value]
+
+    if isinstance(value, (list, tuple)):
+        values = []
+        for item in value:
+            values.extend(_resolve(item, path))
+
+        return values
+
+    if not isinstance(value, dict) or path[0] not in value:
+        return []
+
+    return _resolve(value[path[0]], path[1:])
+
+
+class Replayer(object):
+    '''Replay recorded events against actions and report their performance.
+
+    `actions` list of :class:`~ftrack_action_handler.action.BaseAction`
+    instances to replay events to.
+
+    `path` a file written by :class:`Recorder`.
+
+    `speed` multiplier of the recorded pace, ie. 1 or 10, events are replayed
+    as fast as possible if None.
+
+    `session` used by the actions during the replay instead of their own,
+    defaults to a :class:`StandInSession` with the schemas of the first
+    action's session so replays never reach a server. Pass a
+    ftrack_api.Session not connected to the event hub to replay against a
+    server, a staging one rather than production as replayed launches make
+    their changes again. Actions running as the user create sessions of
+    their own, which reach the server of their session.
+
+    `concurrency` number of events handled at the same time. Events are
+    handled one after the other by default, as the event hub of an action
+    host does, while a higher concurrency reproduces the load of several
+    hosts sharing the same server.
+
+    '''
+
+    def __init__(self, actions, path, speed=1.0, session=None, concurrency=1):
+        '''Initialise replayer.'''
+        self.logger = logging.getLogger(
+            '{0}.{1}'.format(__name__, self.__class__.__name__)
+        )
+        self.actions = actions
+        self.path = path
+        self.speed = speed
+        self.concurrency = concurrency
+
+        if session is None:
+            schemas = []
+            if actions:
+                schemas = actions[0].session.schemas
+
+            session = StandInSession(schemas=schemas)
+
+        self.session = session
+
+    def records(self):
+        '''Return list of records read from :attr:`path`.'''
+        records = []
+        with open(self.path) as record_file:
+            for line in record_file:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+
+        # A launch is recorded by every action registered for it.
+        seen = set()
+        unique = []
+        for record in sorted(records, key=lambda item: item['time']):
+            key = (record['name'], record['event'].get('id'))
+            if record['event'].get('id') is not None and key in seen:
+                continue
+
+            seen.add(key)
+            unique.append(record)
+
+        return unique
+
+    def run(self):
+        '''Replay recorded events and return report.
+
+        The report is a dictionary with the number of replayed events, errors,
+        throughput in events per second, latency percentiles in seconds per
+        handler name and the number of server calls and operations made.
+
+        '''
+        records = self.records()
+
+        sessions = {}
+        for action in self.actions:
+            sessions[action] = action._session
+            action._session = self.session
+
+        counter = operations.counter(self.session)
+        calls = counter.calls
+        counted = collections.Counter(counter.operations)
+        pool = None
+        if self.concurrency > 1:
+            pool = WorkerPool(self.concurrency)
+
+        results = []
+        tasks = []
+
+        start = time.time()
+        try:
+            for record in records:
+                self._wait(record, records[0]['time'], start)
+                event = ftrack_api.event.base.Event(
+                    topic=record['event'].get('topic'),
+                    id=record['event'].get('id'),
+                    data=record['event'].get('data'),
+                    source=record['event'].get('source'),
+                    target=record['event'].get('target', '')
+                )
+
+                for action in self._actions_for(record['name'], event):
+                    if pool is None:
+                        results.append(
+                            self._replay(record['name'], action, event)
+                        )
+                    else:
+                        tasks.append(
+                            pool.submit(
+                                self._replay, record['name'], action, event
+                            )
+                        )
+
+            for task in tasks:
+                task.done.wait()
+                results.append(task.result)
+
+        finally:
+            duration = time.time() - start
+
+            for action, session in sessions.items():
+                action._session = session
+
+        report = {
+            'events': len(records),
+            'errors': sum(1 for _, _, failed in results if failed),
+            'duration': duration,
+            'throughput': len(records) / duration if duration else None,
+            'latency': {},
+            'calls': counter.calls - calls,
+            'operations': dict(counter.operations - counted)
+        }
+
+        latencies = {}
+        for name, latency, _ in results:
+            latencies.setdefault(name, []).append(latency)
+
+        for name, values in latencies.items():
+            values = sorted(values)
+            report['latency'][name] = {
+                'p50': percentile(values, 0.5),
+                'p90': percentile(values, 0.9),
+                'p99': percentile(values, 0.99),
+                'max': values[-1]
+            }
+
+        return report
+
+    def _replay(self, name, action, event):
+        '''Return name, latency and failure of *action* handling *event*.'''
+        handler = action._handle_discover
+        if name == 'launch':
+            handler = action._handle_launch
+
+        handled = time.time()
+        failed = False
+        try:
+            handler(event)
+        except Exception:
+            failed = True
+            self.logger.exception(
+                'Replaying {0} to {1} failed.'.format(name, action.identifier)
+            )
+
+        return name, time.time() - handled, failed
+
+    def _wait(self, record, first, start):
+        '''Sleep until *record* is due relative to *first* and *start*.'''
+        if not self.speed:
+            return
+
+        delay = (record['time'] - first) / self.speed - (time.time() - start)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _actions_for(self, name, event):
+        '''Return actions subscribed to *event* handled by *name*.'''
+        if name == 'discover':
+            return self.actions
+
+        identifier = event['data'].get('actionIdentifier')
+        return [
+            action for action in self.actions
+            if action.identifier == identifier
+        ]
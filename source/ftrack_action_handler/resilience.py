@@ -0,0 +1,209 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import logging
+import random
+import re
+import threading
+import time
+
+import ftrack_api
+import requests
+
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(RuntimeError):
+    '''Raise when a call is refused by an open circuit.'''
+
+
+class CircuitBreaker(object):
+    '''Stop calling a failing server until it recovers.
+
+    `failures` number of consecutive failures opening the circuit.
+
+    `reset_timeout` seconds before a single call is let through an open
+    circuit to check whether the server recovered.
+
+    '''
+
+    def __init__(self, failures=5, reset_timeout=30.0):
+        '''Initialise breaker.'''
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened = None
+        self._trial = False
+
+    @property
+    def state(self):
+        '''Return state of the circuit, closed, open or half-open.'''
+        with self._lock:
+            if self._opened is None:
+                return 'closed'
+
+            if self._trial or time.time() - self._opened >= self.reset_timeout:
+                return 'half-open'
+
+            return 'open'
+
+    def allow(self):
+        '''Return whether a call is allowed through the circuit.'''
+        with self._lock:
+            if self._opened is None:
+                return True
+
+            if (
+                not self._trial and
+                time.time() - self._opened >= self.reset_timeout
+            ):
+                self._trial = True
+                return True
+
+            return False
+
+    def success(self):
+        '''Record a successful call, closing the circuit.'''
+        with self._lock:
+            if self._opened is not None:
+                logger.info('Circuit closed, server recovered.')
+
+            self._failures = 0
+            self._opened = None
+            self._trial = False
+
+    def failure(self):
+        '''Record a failed call, opening the circuit if failing repeatedly.'''
+        with self._lock:
+            self._failures += 1
+            if self._trial or (
+                self._opened is None and self._failures >= self.failures
+            ):
+                if self._opened is None:
+                    logger.warning(
+                        'Circuit opened after {0} failures.'.format(
+                            self._failures
+                        )
+                    )
+
+                self._opened = time.time()
+                self._trial = False
+
+    @property
+    def is_open(self):
+        '''Return whether calls are currently refused.'''
+        return self.state == 'open'
+
+
+def is_transient(error):
+    '''Return whether *error* is a failure to reach the server.
+
+    Connection errors, timeouts and HTTP 5xx responses are transient, as is a
+    ftrack_api.exception.ServerError raised for them or for a response in an
+    unexpected format, ie. the error page of a proxy. Errors the server
+    reports, such as validation, query or permission errors, are not.
+    '''
+    if isinstance(
+        error,
+        (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+    ):
+        return True
+
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is None or error.response.status_code >= 500
+
+    if isinstance(error, ftrack_api.exception.ServerError):
+        message = getattr(error, 'message', None) or ''
+        if message.startswith('Server reported error in unexpected format'):
+            return True
+
+        # Raised with the message of the HTTP error, ie. "503 Server Error".
+        status = re.match(r'(\d{3}) ', message)
+        return status is not None and int(status.group(1)) >= 500
+
+    return False
+
+
+def call(
+    callback, attempts=1, backoff=0.2, exceptions=(Exception,), breaker=None,
+    transient=None
+):
+    '''Return result of *callback*, retrying on failure.
+
+    *callback* is called up to *attempts* times while it raises one of
+    *exceptions*, sleeping a random time of up to *backoff* seconds, doubled
+    for each retry, in between. If *transient* is given only errors it returns
+    true for are retried, others are raised right away as the server answered.
+    If a *breaker* is given failures are recorded with it and
+    :exc:`CircuitOpenError` is raised without calling *callback* while its
+    circuit is open.
+
+    '''
+    attempt = 0
+    while True:
+        attempt += 1
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError('Circuit to the server is open.')
+
+        try:
+            result = callback()
+
+        except exceptions as error:
+            if transient is not None and not transient(error):
+                # The server answered, only the request was not valid.
+                if breaker is not None:
+                    breaker.success()
+                raise
+
+            if breaker is not None:
+                breaker.failure()
+
+            if attempt >= attempts or (
+                breaker is not None and breaker.is_open
+            ):
+                raise
+
+            delay = random.uniform(0, backoff * 2 ** (attempt - 1))
+            logger.debug(
+                'Call failed, retrying in {0:.3f}s.'.format(delay),
+                exc_info=True
+            )
+            time.sleep(delay)
+
+        except Exception:
+            # The server answered, only the request was not valid.
+            if breaker is not None:
+                breaker.success()
+            raise
+
+        else:
+            if breaker is not None:
+                breaker.success()
+
+            return result
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(server_url, failures=5, reset_timeout=30.0):
+    '''Return :class:`CircuitBreaker` shared by all calls to *server_url*.
+
+    Calls with different *failures* or *reset_timeout* settings share a
+    breaker with those settings.
+
+    '''
+    key = (server_url, failures, reset_timeout)
+    with _breakers_lock:
+        result = _breakers.get(key)
+        if result is None:
+            result = CircuitBreaker(
+                failures=failures, reset_timeout=reset_timeout
+            )
+            _breakers[key] = result
+
+    return result
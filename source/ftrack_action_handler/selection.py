@@ -0,0 +1,219 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import array
+import bisect
+import collections
+import itertools
+
+
+class EntitySelection(object):
+    '''Selection of entities grouped by entity type.
+
+    `entities` an iterable of tuples each containing the entity type and the
+    entity id.
+
+    Iterating, indexing and comparing behaves like the list of tuples it was
+    created from, while :meth:`by_type`, :meth:`ids` and membership tests use
+    the ids grouped and deduplicated per entity type.
+
+    Each id is stored once, in the list of ids of its entity type. The order
+    of the tuples is kept as a compact index only if it differs from the ids
+    grouped per type, ie. when types are interleaved or ids repeated.
+
+    '''
+
+    __slots__ = ('_types', '_order', '_members')
+
+    def __init__(self, entities=()):
+        '''Initialise selection.'''
+        # Ordered dictionaries keep insertion order on Python 2 as well.
+        self._types = collections.OrderedDict()
+        self._members = None
+
+        # Index of entity type and id of each tuple, only kept if needed.
+        type_indices = array.array('H')
+        id_indices = array.array('L')
+        grouped = True
+
+        indices = {}
+        positions = {}
+        for entity_type, entity_id in entities:
+            type_index = indices.get(entity_type)
+            if type_index is None:
+                type_index = indices[entity_type] = len(indices)
+                self._types[entity_type] = []
+                positions[entity_type] = {}
+
+            ids = self._types[entity_type]
+            position = positions[entity_type].get(entity_id)
+            if position is None:
+                position = positions[entity_type][entity_id] = len(ids)
+                ids.append(entity_id)
+            else:
+                grouped = False
+
+            if type_indices and type_index < type_indices[-1]:
+                grouped = False
+
+            type_indices.append(type_index)
+            id_indices.append(position)
+
+        self._order = None
+        if not grouped:
+            self._order = (type_indices, id_indices)
+
+    def __iter__(self):
+        '''Iterate over tuples of entity type and entity id.'''
+        if self._order is None:
+            for entity_type, ids in self._types.items():
+                for entity_id in ids:
+                    yield entity_type, entity_id
+
+            return
+
+        types = list(self._types.items())
+        for type_index, position in zip(*self._order):
+            entity_type, ids = types[type_index]
+            yield entity_type, ids[position]
+
+    def __len__(self):
+        '''Return number of selected entities.'''
+        if self._order is None:
+            return sum(len(ids) for ids in self._types.values())
+
+        return len(self._order[0])
+
+    def __getitem__(self, index):
+        '''Return tuple of entity type and entity id at *index*.'''
+        if isinstance(index, slice):
+            return list(self)[index]
+
+        length = len(self)
+        if index < 0:
+            index += length
+
+        if not 0 <= index < length:
+            raise IndexError('Selection index out of range.')
+
+        if self._order is not None:
+            type_indices, id_indices = self._order
+            entity_type, ids = list(self._types.items())[type_indices[index]]
+            return entity_type, ids[id_indices[index]]
+
+        for entity_type, ids in self._types.items():
+            if index < len(ids):
+                return entity_type, ids[index]
+
+            index -= len(ids)
+
+    def __contains__(self, item):
+        '''Return whether *item*, an entity type and id tuple, is selected.'''
+        try:
+            entity_type, entity_id = item
+        except (TypeError, ValueError):
+            return False
+
+        if entity_type not in self._types:
+            return False
+
+        # Sorted ids for membership tests are only built when first needed,
+        # holding a reference per id where a set would hold a larger table.
+        if self._members is None:
+            self._members = {}
+
+        members = self._members.get(entity_type)
+        if members is None:
+            try:
+                members = sorted(self._types[entity_type])
+            except TypeError:
+                # Ids of different types do not sort on Python 3.
+                members = frozenset(self._types[entity_type])
+
+            self._members[entity_type] = members
+
+        if isinstance(members, frozenset):
+            return entity_id in members
+
+        try:
+            index = bisect.bisect_left(members, entity_id)
+        except TypeError:
+            return False
+
+        return index < len(members) and members[index] == entity_id
+
+    def __eq__(self, other):
+        '''Return whether *other* holds the same entities in the same order.'''
+        if not isinstance(other, EntitySelection):
+            try:
+                other = list(other)
+            except TypeError:
+                return NotImplemented
+
+        if len(self) != len(other):
+            return False
+
+        return all(mine == theirs for mine, theirs in zip(self, other))
+
+    def __ne__(self, other):
+        '''Return whether *other* differs from this selection.'''
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+
+        return not result
+
+    __hash__ = None
+
+    def __bool__(self):
+        '''Return whether any entity is selected.'''
+        return bool(self._types)
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        '''Return representation.'''
+        return '<{0} {1!r}>'.format(self.__class__.__name__, list(self))
+
+    def types(self):
+        '''Return list of selected entity types.'''
+        return list(self._types.keys())
+
+    def by_type(self):
+        '''Return ordered dictionary of unique entity ids per entity type.'''
+        return collections.OrderedDict(
+            (entity_type, list(ids)) for entity_type, ids in self._types.items()
+        )
+
+    def ids(self, entity_type=None):
+        '''Return list of unique entity ids, limited to *entity_type* if set.'''
+        if entity_type is not None:
+            return list(self._types.get(entity_type, ()))
+
+        return list(itertools.chain.from_iterable(self._types.values()))
+
+    def entities(self, session, attributes=None, batch_size=100):
+        '''Yield selected entities loaded from *session* in batches.
+
+        *attributes* is an optional list of attributes to load with each
+        entity. Each batch of at most *batch_size* entities of the same type
+        is loaded with a single query when iterated over.
+
+        '''
+        for entity_type, ids in self._types.items():
+            for index in range(0, len(ids), batch_size):
+                expression = '{0} where id in ({1})'.format(
+                    entity_type,
+                    ', '.join(
+                        '"{0}"'.format(entity_id)
+                        for entity_id in ids[index:index + batch_size]
+                    )
+                )
+
+                if attributes:
+                    expression = 'select {0} from {1}'.format(
+                        ', '.join(attributes), expression
+                    )
+
+                for entity in session.query(expression):
+                    yield entity
@@ -0,0 +1,126 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import contextlib
+import logging
+import threading
+import weakref
+
+import ftrack_api
+
+
+logger = logging.getLogger(__name__)
+
+class WorkerSessions(object):
+    '''Sessions used by worker threads in place of a shared session.
+
+    `session` a ftrack_api.Session instance shared by the actions, which is
+    not safe to use from several threads at once.
+
+    Sessions are created on demand with the server and credentials of
+    `session`, without event hub connection or plugins, and handed to one
+    thread at a time with :meth:`acquire`. Released sessions are reused by
+    later threads, so at most one session is created per concurrently
+    running worker. Creating a session loads the server information and
+    schemas, so actions with time budgets :meth:`reserve` sessions ahead of
+    time. A session with a true `thread_safe` attribute, such as
+    :class:`~ftrack_action_handler.replay.StandInSession`, is shared as is.
+
+    '''
+
+    def __init__(self, session):
+        '''Initialise worker sessions.'''
+        self.server_url = session.server_url
+        self.api_key = session.api_key
+        self.api_user = session.api_user
+
+        self._shared = None
+        if getattr(session, 'thread_safe', False):
+            self._shared = weakref.ref(session)
+
+        self._lock = threading.Lock()
+        self._idle = []
+        self._created = 0
+
+    @contextlib.contextmanager
+    def acquire(self):
+        '''Yield session for use by the current thread only.'''
+        if self._shared is not None:
+            yield self._shared()
+            return
+
+        with self._lock:
+            session = self._idle.pop() if self._idle else None
+            if session is None:
+                self._created += 1
+
+        if session is None:
+            try:
+                session = self.create()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            yield session
+        finally:
+            if len(session.recorded_operations):
+                session.rollback()
+
+            with self._lock:
+                self._idle.append(session)
+
+    def reserve(self, count):
+        '''Create sessions in a background thread until *count* exist.'''
+        if self._shared is not None:
+            return
+
+        with self._lock:
+            missing = count - self._created
+            if missing <= 0:
+                return
+
+            self._created += missing
+
+        thread = threading.Thread(target=self._reserve, args=(missing,))
+        thread.daemon = True
+        thread.start()
+
+    def _reserve(self, count):
+        '''Create *count* idle sessions.'''
+        for index in range(count):
+            try:
+                session = self.create()
+            except Exception:
+                logger.exception('Unable to create worker session.')
+                with self._lock:
+                    self._created -= count - index
+                return
+
+            with self._lock:
+                self._idle.append(session)
+
+    def create(self):
+        '''Return new session.'''
+        return ftrack_api.Session(
+            server_url=self.server_url,
+            api_key=self.api_key,
+            api_user=self.api_user,
+            auto_connect_event_hub=False,
+            plugin_paths=[]
+        )
+
+
+_worker_sessions = weakref.WeakKeyDictionary()
+_worker_sessions_lock = threading.Lock()
+
+
+def worker_sessions(session):
+    '''Return :class:`WorkerSessions` shared by the actions of *session*.'''
+    with _worker_sessions_lock:
+        result = _worker_sessions.get(session)
+        if result is None:
+            result = _worker_sessions[session] = WorkerSessions(session)
+
+    return result
@@ -0,0 +1,102 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import pytest
+
+from ftrack_action_handler.action import BaseAction
+from ftrack_action_handler.replay import StandInSession
+
+
+class Action(BaseAction):
+    '''Action updating entities in bulk.'''
+
+    label = 'Test action'
+    identifier = 'test_bulk_update'
+
+
+class FailingSession(StandInSession):
+    '''Session failing the commits numbered in :attr:`failing`.'''
+
+    def __init__(self, *args, **kwargs):
+        '''Initialise session.'''
+        super(FailingSession, self).__init__(*args, **kwargs)
+        self.failing = set()
+        self.commits = 0
+
+    def commit(self):
+        '''Commit, raising if the commit is one of :attr:`failing`.'''
+        self.commits += 1
+        if self.commits in self.failing:
+            raise RuntimeError('Commit failed.')
+
+        super(FailingSession, self).commit()
+
+
+def upper(attribute, value):
+    '''Return *value* in upper case.'''
+    return value.upper()
+
+
+def test_failed_chunks_reported():
+    '''Roll back failing chunks, commit the others and report missing ids.'''
+    session = FailingSession({
+        'Task': [
+            {'id': 'task-{0}'.format(index), 'name': 'name'}
+            for index in range(5)
+        ]
+    })
+    session.failing.add(2)
+    action = Action(session)
+
+    entities = [('Task', 'task-{0}'.format(index)) for index in range(6)]
+    result = action.bulk_update(
+        session, entities, ['name'], upper, chunk_size=2
+    )
+
+    assert result['updated'] == 3
+    assert result['failed'] == 2
+    assert result['unchanged'] == 0
+    assert result['errors'] == [
+        {'ids': ['task-2', 'task-3'], 'message': 'Commit failed.'}
+    ]
+    assert result['missing'] == [('Task', 'task-5')]
+
+    names = dict(
+        (entity['id'], entity['name'])
+        for entity in session.query('Task')
+    )
+    assert names == {
+        'task-0': 'NAME',
+        'task-1': 'NAME',
+        'task-2': 'name',
+        'task-3': 'name',
+        'task-4': 'NAME'
+    }
+    assert not session.recorded_operations
+
+
+def test_pending_operations_refused():
+    '''Raise instead of committing operations pending before the update.'''
+    session = StandInSession({'Task': [{'id': 'task-1', 'name': 'name'}]})
+    session.create('Task', {'name': 'pending'})
+    action = Action(session)
+
+    with pytest.raises(RuntimeError):
+        action.bulk_update(session, [('Task', 'task-1')], ['name'], upper)
+
+    assert len(session.recorded_operations) == 1
+
+
+def test_unchanged_not_committed():
+    '''Count entities left unchanged by the transform without committing.'''
+    session = StandInSession({'Task': [{'id': 'task-1', 'name': 'NAME'}]})
+    action = Action(session)
+
+    result = action.bulk_update(session, [('Task', 'task-1')], ['name'], upper)
+
+    assert result['updated'] == 0
+    assert result['unchanged'] == 1
+    assert all(
+        operation['action'] == 'query'
+        for data in session.calls for operation in data
+    )
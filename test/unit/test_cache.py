@@ -0,0 +1,147 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import threading
+import time
+
+import pytest
+
+from ftrack_action_handler.action import AdvancedBaseAction
+from ftrack_action_handler.cache import MemoryCache, SqliteCache
+from ftrack_action_handler.replay import StandInSession
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cache(request, tmp_path):
+    '''Return cache of each backend.'''
+    if request.param == 'memory':
+        return MemoryCache()
+
+    return SqliteCache(str(tmp_path / 'cache.db'))
+
+
+def test_get_and_set(cache):
+    '''Return values set, raise KeyError for missing keys.'''
+    cache.set(('key', 1), {'value': [1, 2]})
+
+    assert cache.get(('key', 1)) == {'value': [1, 2]}
+    assert cache.keys() == [('key', 1)]
+
+    with pytest.raises(KeyError):
+        cache.get(('missing',))
+
+
+def test_remove_and_clear(cache):
+    '''Remove single keys or all of them.'''
+    cache.set('first', 1)
+    cache.set('second', 2)
+
+    cache.remove('first')
+    with pytest.raises(KeyError):
+        cache.remove('first')
+
+    assert cache.keys() == ['second']
+
+    cache.clear()
+    assert cache.keys() == []
+
+
+def test_ttl(cache):
+    '''Expire values after their ttl.'''
+    cache.set('expiring', 1, ttl=0.05)
+    cache.set('kept', 2)
+
+    assert cache.get('expiring') == 1
+
+    time.sleep(0.06)
+    with pytest.raises(KeyError):
+        cache.get('expiring')
+
+    assert cache.keys() == ['kept']
+
+
+def test_sweep(cache):
+    '''Remove expired values not read again.'''
+    cache.set('expiring', 1, ttl=0)
+    cache.sweep()
+
+    if isinstance(cache, MemoryCache):
+        assert 'expiring' not in cache._values
+    else:
+        assert cache._connection().execute(
+            'SELECT COUNT(*) FROM cache'
+        ).fetchone()[0] == 0
+
+
+def test_sweep_on_set():
+    '''Sweep expired values while setting once the interval passed.'''
+    cache = MemoryCache(sweep_interval=0)
+    cache.set('expiring', 1, ttl=0)
+    cache.set('kept', 2)
+
+    assert list(cache._values) == ['kept']
+
+
+def test_sqlite_shared_between_connections(tmp_path):
+    '''See values set and removed through other connections to the file.'''
+    path = str(tmp_path / 'cache.db')
+    first = SqliteCache(path)
+    second = SqliteCache(path)
+
+    first.set('key', 'value', ttl=60)
+    assert second.get('key') == 'value'
+
+    values = []
+    thread = threading.Thread(target=lambda: values.append(first.get('key')))
+    thread.start()
+    thread.join()
+    assert values == ['value']
+
+    second.remove('key')
+    with pytest.raises(KeyError):
+        first.get('key')
+
+
+class Action(AdvancedBaseAction):
+    '''Action allowed for artists, caching permissions.'''
+
+    label = 'Test action'
+    identifier = 'test.cache'
+    allowed_groups = ['artists']
+    discover_cache_ttl = 60
+
+
+def test_permissions_shared_between_processes(tmp_path):
+    '''Answer permission checks of other processes from the backend.'''
+    path = str(tmp_path / 'cache.db')
+    event = {'source': {'user': {'id': 'user-1', 'username': 'artist'}}}
+
+    sessions = []
+    for _ in range(2):
+        session = StandInSession({
+            'Group': [{
+                'name': 'artists',
+                'memberships': [{'user': {'username': 'artist'}}]
+            }]
+        })
+        action = Action(session)
+        action._cache = SqliteCache(path)
+        sessions.append(session)
+
+        assert action._get_permissions_(event) is True
+
+    assert [len(session.calls) for session in sessions] == [1, 0]
+
+
+def test_check_permissions_with_event_user():
+    '''Check permissions of the user of the event source.'''
+    session = StandInSession({
+        'Group': [{
+            'name': 'artists',
+            'memberships': [{'user': {'username': 'artist'}}]
+        }]
+    })
+    action = Action(session)
+
+    assert action._check_permissions_({'id': 'user-1', 'username': 'artist'})
+    assert not action._check_permissions_({'id': 'user-2', 'username': 'other'})
@@ -0,0 +1,128 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import uuid
+
+from ftrack_action_handler import health
+from ftrack_action_handler.action import BaseAction
+from ftrack_action_handler.replay import StandInSession
+
+
+SCHEMAS = [{'id': 'Task'}]
+
+
+class Action(BaseAction):
+    '''Action recording the entities it is launched with.'''
+
+    label = 'Test action'
+    identifier = 'test_coalesce'
+    coalesce_window = 0.05
+
+    def __init__(self, session):
+        '''Initialise action.'''
+        super(Action, self).__init__(session)
+        self.launched = []
+
+    def launch(self, session, entities, event):
+        '''Record launched *entities*.'''
+        self.launched.append(list(entities))
+        return True
+
+
+class InterfaceAction(Action):
+    '''Action asking for a name before launching.'''
+
+    def interface(self, session, entities, event):
+        '''Return name field unless submitted.'''
+        if not event['data'].get('values'):
+            return [{'type': 'text', 'name': 'name', 'label': 'Name'}]
+
+
+def make_event(entity_ids, username='user', values=None):
+    '''Return launch event of *username* over *entity_ids*.'''
+    event = {
+        'id': str(uuid.uuid4()),
+        'topic': 'ftrack.action.launch',
+        'source': {'user': {'username': username}},
+        'data': {
+            'actionIdentifier': Action.identifier,
+            'selection': [
+                {'entityType': 'task', 'entityId': entity_id}
+                for entity_id in entity_ids
+            ]
+        }
+    }
+    if values is not None:
+        event['data']['values'] = values
+
+    return event
+
+
+def test_coalesced_launches_replied_to():
+    '''Launch merged selection once and reply to each coalesced event.'''
+    session = StandInSession(schemas=SCHEMAS)
+    action = Action(session)
+
+    events = [
+        make_event(['task-1', 'task-2']),
+        make_event(['task-2', 'task-3'])
+    ]
+    for event in events:
+        assert action._handle_launch(event) is None
+
+    assert action.unregister(timeout=5)
+
+    assert action.launched == [
+        [('Task', 'task-1'), ('Task', 'task-2'), ('Task', 'task-3')]
+    ]
+    assert [source for source, _ in session.event_hub.replies] == events
+    for _, data in session.event_hub.replies:
+        assert data['success'] is True
+
+
+def test_launches_by_other_users_not_coalesced():
+    '''Launch batches of different users separately.'''
+    session = StandInSession(schemas=SCHEMAS)
+    action = Action(session)
+
+    action._handle_launch(make_event(['task-1'], username='first'))
+    action._handle_launch(make_event(['task-2'], username='second'))
+
+    assert action.unregister(timeout=5)
+
+    assert sorted(action.launched) == [
+        [('Task', 'task-1')], [('Task', 'task-2')]
+    ]
+    assert len(session.event_hub.replies) == 2
+
+
+def test_merged_launch_handled_once():
+    '''Record statistics of the merged launch only.'''
+    action = Action(StandInSession(schemas=SCHEMAS))
+    action._statistics = health.Statistics()
+
+    for index in range(3):
+        action._handle_launch(make_event(['task-{0}'.format(index)]))
+
+    assert action.unregister(timeout=5)
+
+    assert action._statistics._totals[(Action.identifier, 'launch')] == 1
+
+
+def test_interface_shown_before_coalescing():
+    '''Show the interface right away and merge launches with values.'''
+    session = StandInSession(schemas=SCHEMAS)
+    action = InterfaceAction(session)
+
+    result = action._handle_launch(make_event(['task-1']))
+    assert result['items'][0]['name'] == 'name'
+
+    for entity_id in ('task-1', 'task-2'):
+        assert action._handle_launch(
+            make_event([entity_id], values={'name': 'new'})
+        ) is None
+
+    assert action.unregister(timeout=5)
+
+    assert action.launched == [[('Task', 'task-1'), ('Task', 'task-2')]]
+    assert len(session.event_hub.replies) == 2
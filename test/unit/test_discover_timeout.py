@@ -0,0 +1,136 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import threading
+import time
+
+from ftrack_action_handler import sessions
+from ftrack_action_handler.action import BaseAction
+from ftrack_action_handler.replay import StandInSession
+
+
+class Action(BaseAction):
+    '''Action discovering once :attr:`release` is set.'''
+
+    label = 'Test action'
+    identifier = 'test.discover_timeout'
+    discover_timeout = 0.05
+    discover_workers = 1
+
+    def __init__(self, session):
+        '''Initialise action.'''
+        super(Action, self).__init__(session)
+        self.release = threading.Event()
+        self.threads = []
+
+    def discover(self, session, entities, event):
+        '''Accept any selection once released.'''
+        self.threads.append(threading.current_thread())
+        self.release.wait(5)
+        return True
+
+
+class Session(object):
+    '''Session holding only the settings worker sessions are created with.'''
+
+    server_url = 'http://worker.localhost'
+    api_key = 'key'
+    api_user = 'user'
+
+
+class CountingSessions(sessions.WorkerSessions):
+    '''Worker sessions creating stand-in sessions.'''
+
+    def __init__(self, session):
+        '''Initialise worker sessions.'''
+        super(CountingSessions, self).__init__(session)
+        self.created = []
+
+    def create(self):
+        '''Return new stand-in session.'''
+        session = StandInSession()
+        self.created.append(session)
+        return session
+
+
+EVENT = {
+    'id': 'event-1',
+    'source': {'user': {'username': 'user'}},
+    'data': {'selection': [{'entityType': 'task', 'entityId': 'task-1'}]}
+}
+
+
+def test_overruns_counted():
+    '''Skip replying to discovers past the timeout or without a worker.'''
+    action = Action(StandInSession(schemas=[{'id': 'Task'}]))
+
+    try:
+        assert action._handle_discover(EVENT) is None
+        assert action.discover_overruns == 1
+
+        # The only worker is still busy with the first discover.
+        assert action._handle_discover(EVENT) is None
+        assert action.discover_overruns == 2
+
+    finally:
+        action.release.set()
+
+
+def test_reply_within_timeout():
+    '''Reply to discovers finished within the timeout.'''
+    action = Action(StandInSession(schemas=[{'id': 'Task'}]))
+    action.release.set()
+
+    result = action._handle_discover(EVENT)
+
+    assert result['items'][0]['actionIdentifier'] == Action.identifier
+    assert action.discover_overruns == 0
+
+
+def test_worker_threads_reused():
+    '''Run discovers on long lived worker threads.'''
+    action = Action(StandInSession(schemas=[{'id': 'Task'}]))
+    action.release.set()
+
+    for _ in range(3):
+        assert action._handle_discover(EVENT) is not None
+
+    assert len(set(action.threads)) == 1
+    assert action.threads[0] is not threading.current_thread()
+
+
+def test_sessions_reserved_ahead():
+    '''Create reserved sessions in the background and hand them out.'''
+    worker_sessions = CountingSessions(Session())
+
+    worker_sessions.reserve(2)
+    worker_sessions.reserve(2)
+
+    deadline = time.time() + 5
+    while len(worker_sessions._idle) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert len(worker_sessions.created) == 2
+
+    with worker_sessions.acquire() as first:
+        with worker_sessions.acquire() as second:
+            assert set([first, second]) == set(worker_sessions.created)
+
+    with worker_sessions.acquire():
+        pass
+
+    assert len(worker_sessions.created) == 2
+
+
+def test_sessions_created_beyond_reserved():
+    '''Create sessions when all reserved ones are in use.'''
+    worker_sessions = CountingSessions(Session())
+
+    with worker_sessions.acquire():
+        with worker_sessions.acquire():
+            pass
+
+    worker_sessions.reserve(2)
+
+    assert len(worker_sessions.created) == 2
+    assert len(worker_sessions._idle) == 2
@@ -0,0 +1,145 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import threading
+import time
+
+from ftrack_action_handler import dispatch
+from ftrack_action_handler.action import BaseAction
+from ftrack_action_handler.replay import StandInSession
+
+
+class Action(BaseAction):
+    '''Action discovered in parallel, once :attr:`release` is set.'''
+
+    label = 'Test action'
+    identifier = 'test.dispatch'
+    parallel_discover = True
+    parallel_discover_timeout = 0.2
+
+    def __init__(self, session, identifier, blocking=False):
+        '''Initialise action with *identifier*.'''
+        super(Action, self).__init__(session)
+        self.identifier = identifier
+        self.release = threading.Event()
+        if not blocking:
+            self.release.set()
+
+    def discover(self, session, entities, event):
+        '''Accept any selection once released.'''
+        self.release.wait(5)
+        return True
+
+
+EVENT = {
+    'id': 'event-1',
+    'source': {'user': {'username': 'user'}},
+    'data': {'selection': []}
+}
+
+
+def test_queue_full():
+    '''Fail tasks right away while the queue is full.'''
+    pool = dispatch.WorkerPool(1, queue_size=1)
+    release = threading.Event()
+
+    running = pool.submit(release.wait, 5)
+    time.sleep(0.05)
+    queued = pool.submit(lambda: 'queued')
+    rejected = pool.submit(lambda: 'rejected')
+
+    assert rejected.done.is_set()
+    assert isinstance(rejected.error, dispatch.QueueFullError)
+
+    release.set()
+    assert running.done.wait(5)
+    assert queued.done.wait(5)
+    assert queued.result == 'queued'
+
+
+def test_deadline():
+    '''Drop tasks not started before their deadline.'''
+    pool = dispatch.WorkerPool(1)
+    release = threading.Event()
+
+    pool.submit(release.wait, 5)
+    expired = pool.submit(lambda: 'expired', deadline=time.time() + 0.05)
+    kept = pool.submit(lambda: 'kept', deadline=time.time() + 60)
+
+    time.sleep(0.1)
+    release.set()
+
+    assert expired.done.wait(5)
+    assert isinstance(expired.error, dispatch.TaskExpiredError)
+    assert kept.done.wait(5)
+    assert kept.result == 'kept'
+
+
+def test_items_gathered():
+    '''Reply with the items of all actions of the session.'''
+    session = StandInSession()
+    actions = [Action(session, 'first'), Action(session, 'second')]
+    for action in actions:
+        action.register()
+
+    try:
+        dispatcher = dispatch.dispatcher(session)
+        assert len(session.event_hub.subscriptions) == 3
+
+        result = dispatcher._handle(EVENT)
+
+        assert sorted(
+            item['actionIdentifier'] for item in result['items']
+        ) == ['first', 'second']
+        assert dispatcher.late == 0
+
+    finally:
+        for action in actions:
+            action.unregister()
+
+    assert session.event_hub.subscriptions == {}
+
+
+def test_late_discovers_counted():
+    '''Reply without the items of actions past their timeout.'''
+    session = StandInSession()
+    slow = Action(session, 'slow', blocking=True)
+    fast = Action(session, 'fast')
+    for action in (slow, fast):
+        action.register()
+
+    try:
+        dispatcher = dispatch.dispatcher(session)
+        result = dispatcher._handle(EVENT)
+
+        assert [item['actionIdentifier'] for item in result['items']] == [
+            'fast'
+        ]
+        assert dispatcher.late == 1
+
+    finally:
+        slow.release.set()
+        for action in (slow, fast):
+            action.unregister()
+
+
+def test_queue_full_counted():
+    '''Count discovers rejected by a full queue as late.'''
+    session = StandInSession()
+    action = Action(session, 'first')
+    action.parallel_discover_workers = 1
+    dispatcher = dispatch.DiscoverDispatcher(session, queue_size=1)
+    dispatcher.add(action)
+
+    release = threading.Event()
+    dispatcher._pool.submit(release.wait, 5)
+    time.sleep(0.05)
+    dispatcher._pool.submit(release.wait, 5)
+
+    try:
+        assert dispatcher._handle(EVENT) is None
+        assert dispatcher.late == 1
+
+    finally:
+        release.set()
+        dispatcher.remove(action)
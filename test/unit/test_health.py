@@ -0,0 +1,101 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import json
+import threading
+
+import pytest
+
+try:
+    from urllib.request import urlopen
+    from urllib.error import HTTPError
+except ImportError:
+    # Python 2.
+    from urllib2 import urlopen, HTTPError
+
+from ftrack_action_handler.health import HealthServer, Statistics
+from ftrack_action_handler.replay import StandInSession
+
+
+@pytest.fixture()
+def server():
+    '''Yield health server running on a free local port.'''
+    server = HealthServer(('127.0.0.1', 0))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, path='/health'):
+    '''Return status and body of a request to *server*.'''
+    url = 'http://127.0.0.1:{0}{1}'.format(server.server_address[1], path)
+    try:
+        response = urlopen(url, timeout=5)
+    except HTTPError as error:
+        response = error
+
+    return response.code, response.read().decode('utf-8')
+
+
+def test_statistics():
+    '''Report totals, errors and latencies per action and handler.'''
+    statistics = Statistics()
+
+    statistics('launch', 'test.action', lambda event: True, {})
+    with pytest.raises(RuntimeError):
+        statistics('launch', 'test.action', _fail, {})
+
+    report = statistics.report()['test.action']['launch']
+    assert report['total'] == 2
+    assert report['errors'] == 1
+    assert report['in_flight'] == 0
+    assert report['rate'] == 2 / 60.0
+    assert set(report['latency']) == {'mean', 'p50', 'p99', 'max'}
+
+
+def test_connected(server):
+    '''Report healthy while all event hubs are connected.'''
+    session = StandInSession()
+    session.event_hub.connected = True
+    server.sessions.append(session)
+
+    status, body = get(server)
+    report = json.loads(body)
+
+    assert status == 200
+    assert report['alive'] is True
+    assert report['status'] == 'ok'
+    assert report['event_hubs'] == [{
+        'server_url': session.server_url,
+        'connected': True,
+        'queued': None
+    }]
+    assert 'actions' in report
+
+
+def test_disconnected(server):
+    '''Report unavailable while an event hub is disconnected.'''
+    server.sessions.append(StandInSession())
+
+    status, body = get(server, '/')
+    report = json.loads(body)
+
+    assert status == 503
+    assert report['status'] == 'disconnected'
+
+
+def test_unknown_path(server):
+    '''Respond not found to other paths.'''
+    status, _ = get(server, '/other')
+
+    assert status == 404
+
+
+def _fail(event):
+    '''Raise error.'''
+    raise RuntimeError('Launch failed.')
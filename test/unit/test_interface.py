@@ -0,0 +1,111 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+from ftrack_action_handler.action import BaseAction
+from ftrack_action_handler.replay import StandInSession
+
+
+class Action(BaseAction):
+    '''Action counting the interfaces it builds.'''
+
+    label = 'Test action'
+    identifier = 'test.interface'
+    cache_interface = True
+
+    def __init__(self, session):
+        '''Initialise action.'''
+        super(Action, self).__init__(session)
+        self.built = 0
+        self.queried = 0
+
+    def interface(self, session, entities, event):
+        '''Return interface asking for a status.'''
+        self.built += 1
+        return [
+            {
+                'type': 'enumerator',
+                'name': 'status',
+                'data': self.cached('statuses', self._query_statuses)
+            },
+            {'type': 'text', 'name': 'comment', 'value': ''}
+        ]
+
+    def _query_statuses(self):
+        '''Return status enumerator data.'''
+        self.queried += 1
+        return [{'label': 'Done', 'value': 'done'}]
+
+
+class SharedAction(Action):
+    '''Action sharing its interface between selections.'''
+
+    identifier = 'test.interface.shared'
+
+    def interface_cache_key(self, session, entities, event):
+        '''Share the interface between selections.'''
+        return 'any selection'
+
+
+def make_event(values=None, entity_id='task-1'):
+    '''Return launch event over *entity_id* with submitted *values*.'''
+    return {
+        'id': 'event-1',
+        'source': {'user': {'username': 'user'}},
+        'data': {
+            'selection': [{'entityType': 'task', 'entityId': entity_id}],
+            'values': values or {}
+        }
+    }
+
+
+def interface(action, event):
+    '''Return interface items of *action* for *event*.'''
+    args = action._translate_event(action.session, event)
+    return action._interface(action.session, *args)['items']
+
+
+def test_not_cached_by_default():
+    '''Build the interface for every event without a cache key.'''
+    action = Action(StandInSession(schemas=[{'id': 'Task'}]))
+
+    interface(action, make_event())
+    interface(action, make_event())
+
+    assert action.built == 2
+    assert action.queried == 1
+    assert not [
+        key for key in action._interface_cache.keys()
+        if key[0] == 'interface'
+    ]
+
+
+def test_shared_template_merged_with_values():
+    '''Build the interface once and merge the values of each event.'''
+    action = SharedAction(StandInSession(schemas=[{'id': 'Task'}]))
+
+    first = interface(action, make_event())
+    second = interface(
+        action, make_event({'comment': 'Looks good'}, entity_id='task-2')
+    )
+
+    assert action.built == 1
+    assert first[1]['value'] == ''
+    assert second[1]['value'] == 'Looks good'
+    assert second[0]['data'] == [{'label': 'Done', 'value': 'done'}]
+
+    # Merging values leaves the cached template untouched.
+    assert interface(action, make_event())[1]['value'] == ''
+
+
+def test_cached_per_action():
+    '''Keep templates of actions sharing a session apart.'''
+    session = StandInSession(schemas=[{'id': 'Task'}])
+    first = SharedAction(session)
+    second = type('OtherAction', (SharedAction,), {'identifier': 'other'})(
+        session
+    )
+
+    interface(first, make_event())
+    interface(second, make_event())
+
+    assert (first.built, second.built) == (1, 1)
@@ -0,0 +1,93 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+from ftrack_action_handler.action import BaseAction
+from ftrack_action_handler.memory import CacheScope
+from ftrack_action_handler.replay import StandInSession
+
+
+def make_session(keys=()):
+    '''Return session with *keys* in its cache.'''
+    session = StandInSession()
+    for key in keys:
+        session.cache.set(key, key)
+
+    return session
+
+
+def test_release_added_entries():
+    '''Remove the entries added within the scope.'''
+    session = make_session(['kept'])
+
+    with CacheScope(session) as scope:
+        session.cache.set('added', 'added')
+
+    assert list(session.cache.keys()) == ['kept']
+    assert (scope.added, scope.released, scope.size) == (1, 1, 1)
+
+
+def test_keep_entries_with_pending_operations():
+    '''Keep added entries while the session has uncommitted operations.'''
+    session = make_session()
+
+    with CacheScope(session) as scope:
+        session.cache.set('added', 'added')
+        session.create('Task', {'name': 'pending'})
+
+    assert list(session.cache.keys()) == ['added']
+    assert (scope.added, scope.released, scope.size) == (1, 0, 1)
+
+
+def test_fifo_limit_removes_oldest_first():
+    '''Remove the entries added first when over the limit.'''
+    session = make_session(['first', 'second'])
+
+    with CacheScope(session, release=False, fifo_limit=2) as scope:
+        session.cache.get('first')
+        session.cache.set('third', 'third')
+
+    assert list(session.cache.keys()) == ['second', 'third']
+    assert (scope.added, scope.released, scope.size) == (1, 1, 2)
+
+
+def test_fifo_limit_after_release():
+    '''Apply the limit to the entries left after releasing added ones.'''
+    session = make_session(['first', 'second', 'third'])
+
+    with CacheScope(session, release=True, fifo_limit=1) as scope:
+        session.cache.set('added', 'added')
+
+    assert list(session.cache.keys()) == ['third']
+    assert (scope.added, scope.released, scope.size) == (1, 3, 1)
+
+
+class Action(BaseAction):
+    '''Action caching an entry per launch.'''
+
+    label = 'Test action'
+    identifier = 'test.memory'
+    release_launch_cache = True
+
+    def launch(self, session, entities, event):
+        '''Cache an entry for *event*.'''
+        session.cache.set(event['id'], event['id'])
+        return True
+
+
+def test_launch_memory_usage():
+    '''Report entries cached and released by launches.'''
+    session = make_session(['kept'])
+    action = Action(session)
+
+    for index in range(2):
+        action._handle_launch({
+            'id': 'event-{0}'.format(index),
+            'source': {'user': {'username': 'user'}},
+            'data': {}
+        })
+
+    assert list(session.cache.keys()) == ['kept']
+    assert action.memory_usage['launches'] == 2
+    assert action.memory_usage['cache_added'] == 2
+    assert action.memory_usage['cache_released'] == 2
+    assert action.memory_usage['cache_size'] == 1
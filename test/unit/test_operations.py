@@ -0,0 +1,119 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import pytest
+
+from ftrack_action_handler import operations
+from ftrack_action_handler.action import BaseAction
+from ftrack_action_handler.replay import StandInSession
+
+
+class Action(BaseAction):
+    '''Action querying tasks three times on launch.'''
+
+    label = 'Test action'
+    identifier = 'test_operations'
+    max_queries = 2
+
+    def launch(self, session, entities, event):
+        '''Query tasks three times.'''
+        for _ in range(3):
+            session.query('Task').all()
+
+        return True
+
+
+EVENT = {
+    'id': 'event-1',
+    'source': {'user': {'username': 'user'}},
+    'data': {'selection': []}
+}
+
+
+def test_counter_install_and_uninstall():
+    '''Count calls while installed and restore the session once uninstalled.'''
+    session = StandInSession()
+    counter = operations.OperationCounter(session)
+
+    with counter:
+        session.query('Task')
+        session.create('Task', {'name': 'new'})
+        session.commit()
+
+    session.query('Task')
+
+    assert counter.calls == 2
+    assert counter.operations == {'query': 1, 'create': 1}
+    assert 'call' not in session.__dict__
+
+
+def test_counter_uninstalled_below_later_wrapper():
+    '''Keep forwarding without counting when wrapped by a later wrapper.'''
+    session = StandInSession()
+    first = operations.OperationCounter(session)
+    second = operations.OperationCounter(session)
+    first.install()
+    second.install()
+
+    first.uninstall()
+    session.query('Task')
+    assert first.calls == 0
+    assert second.calls == 1
+
+    first.install()
+    session.query('Task')
+    assert first.calls == 1
+
+    first.uninstall()
+    second.uninstall()
+    assert session.__dict__['call'] == first._counting_call
+
+    session.query('Task')
+    assert len(session.calls) == 3
+
+
+def test_strict_scope():
+    '''Raise before making operations over the limit, reporting it once.'''
+    session = StandInSession()
+    operations.counter(session)
+    exceeded = []
+
+    scope = operations.OperationScope(
+        limit=1, strict=True, exceeded=exceeded.append
+    )
+    with scope:
+        session.query('Task')
+        for _ in range(2):
+            with pytest.raises(operations.BudgetExceededError):
+                session.query('Task')
+
+    assert exceeded == [scope]
+    assert scope.total == 3
+    assert len(session.calls) == 1
+
+    # Only active scopes count operations.
+    session.query('Task')
+    assert scope.total == 3
+
+
+def test_budget_reported():
+    '''Report launches over budget without aborting them.'''
+    action = Action(StandInSession())
+
+    result = action._handle_launch(EVENT)
+
+    assert result['success'] is True
+    assert action.budget_overruns == 1
+
+
+def test_budget_enforced():
+    '''Abort launches over budget when budgets are enforced.'''
+    session = StandInSession()
+    action = Action(session)
+    action.enforce_budgets = True
+
+    with pytest.raises(operations.BudgetExceededError):
+        action._handle_launch(EVENT)
+
+    assert action.budget_overruns == 1
+    assert len(session.calls) == 2
@@ -0,0 +1,124 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import pytest
+
+from ftrack_action_handler import permissions
+from ftrack_action_handler.action import AdvancedBaseAction
+from ftrack_action_handler.replay import StandInSession
+
+
+class Action(AdvancedBaseAction):
+    '''Action allowed for artists and administrators.'''
+
+    label = 'Test action'
+    identifier = 'test.permissions'
+    allowed_groups = ['artists']
+    allowed_roles = ['Administrator']
+
+
+def make_session():
+    '''Return session with groups, memberships and security roles.'''
+    return StandInSession({
+        'Group': [
+            {
+                'name': 'artists',
+                'memberships': [{'user': {'username': 'artist'}}]
+            },
+            {
+                'name': 'supervisors',
+                'memberships': [{'user': {'username': 'supervisor'}}]
+            }
+        ],
+        'Membership': [
+            {'user': {'username': 'artist'}, 'group': {'name': 'artists'}},
+            {
+                'user': {'username': 'supervisor'},
+                'group': {'name': 'supervisors'}
+            }
+        ],
+        'UserSecurityRole': [
+            {
+                'user': {'username': 'admin'},
+                'security_role': {'name': 'Administrator'}
+            }
+        ]
+    })
+
+
+def queries(session):
+    '''Return number of queries made through *session*.'''
+    return len(session.calls)
+
+
+def test_per_user_queries():
+    '''Query the groups and roles of a single user.'''
+    session = make_session()
+
+    assert permissions.is_group_member(session, 'artist', ['artists'])
+    assert not permissions.is_group_member(session, 'artist', ['supervisors'])
+    assert permissions.has_security_role(session, 'admin', ['Administrator'])
+    assert not permissions.has_security_role(
+        session, 'artist', ['Administrator']
+    )
+
+
+@pytest.mark.parametrize('members_class, allowed, member', [
+    (permissions.GroupMembers, ['artists'], 'artist'),
+    (permissions.RoleMembers, ['Administrator'], 'admin')
+], ids=['groups', 'roles'])
+def test_members_queried_once(members_class, allowed, member):
+    '''Answer checks from members queried once per interval.'''
+    session = make_session()
+    members = members_class(session)
+
+    assert members.is_member(member, allowed, 60)
+    assert not members.is_member('other', allowed, 60)
+    assert queries(session) == 1
+
+
+def test_members_refreshed_after_interval():
+    '''Query members again once older than the interval.'''
+    session = make_session()
+    members = permissions.GroupMembers(session)
+
+    members.is_member('artist', ['artists'], 60)
+    members.is_member('artist', ['artists'], 0)
+
+    assert queries(session) == 2
+
+
+def test_members_refreshed_for_new_names():
+    '''Query members again for names not queried before.'''
+    session = make_session()
+    members = permissions.GroupMembers(session)
+
+    assert members.is_member('artist', ['artists'], 60)
+    assert members.is_member('supervisor', ['supervisors'], 60)
+    assert queries(session) == 2
+
+    # Both groups were queried together with the second check.
+    assert members.is_member('artist', ['artists', 'supervisors'], 60)
+    assert queries(session) == 2
+
+
+def test_names_of_registered_actions():
+    '''Query the names allowed by all actions of the session together.'''
+    session = make_session()
+    action = Action(session)
+    action.register()
+    try:
+        members = permissions.group_members(session)
+        assert members is permissions.group_members(session)
+        assert members.names() == set(['artists'])
+
+        members.refresh(['supervisors'])
+        assert queries(session) == 1
+
+        assert members.is_member('supervisor', ['supervisors'], 60)
+        assert members.is_member('artist', ['artists'], 60)
+        assert queries(session) == 1
+
+    finally:
+        action.unregister()
+
@@ -0,0 +1,110 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import os
+import threading
+
+import pytest
+
+from ftrack_action_handler import profiling
+from ftrack_action_handler.profiling import Profiler
+
+
+IDENTIFIER = 'test_action'
+
+EVENT = {'id': 'event-1'}
+
+
+def written(directory):
+    '''Return sorted suffixes of profiles written to *directory*.'''
+    return sorted(
+        name.split('.', 1)[1] for name in os.listdir(str(directory))
+    )
+
+
+def test_not_sampled(tmp_path):
+    '''Call without profiling when not sampled.'''
+    profiler = Profiler(sample_rate=0.0, threshold=0, directory=str(tmp_path))
+
+    assert profiler('launch', IDENTIFIER, lambda event: 'value', EVENT) == (
+        'value'
+    )
+    assert written(tmp_path) == []
+
+
+def test_sampled_call_written(tmp_path):
+    '''Write profile and memory statistics of sampled calls.'''
+    profiler = Profiler(sample_rate=1.0, threshold=0, directory=str(tmp_path))
+
+    assert profiler('launch', IDENTIFIER, lambda event: 'value', EVENT) == (
+        'value'
+    )
+
+    expected = ['prof']
+    if profiling.tracemalloc is not None:
+        expected.insert(0, 'memory.txt')
+        assert not profiling.tracemalloc.is_tracing()
+
+    assert written(tmp_path) == expected
+
+
+def test_fast_call_not_written(tmp_path):
+    '''Only write profiles of calls slower than the threshold.'''
+    profiler = Profiler(
+        sample_rate=1.0, threshold=60, directory=str(tmp_path)
+    )
+
+    profiler('launch', IDENTIFIER, lambda event: 'value', EVENT)
+
+    assert written(tmp_path) == []
+
+
+def test_one_call_profiled_at_a_time(tmp_path):
+    '''Run calls unprofiled while another call is profiled.'''
+    profiler = Profiler(sample_rate=1.0, threshold=0, directory=str(tmp_path))
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(event):
+        started.set()
+        release.wait(5)
+
+    thread = threading.Thread(
+        target=profiler, args=('launch', 'slow', slow, EVENT)
+    )
+    thread.start()
+    try:
+        assert started.wait(5)
+        profiler('launch', 'fast', lambda event: None, EVENT)
+    finally:
+        release.set()
+        thread.join()
+
+    assert [
+        name for name in os.listdir(str(tmp_path)) if name.startswith('fast')
+    ] == []
+
+
+def test_errors_raised_from_callback(tmp_path):
+    '''Raise errors of the profiled callback and stop tracing memory.'''
+    profiler = Profiler(sample_rate=1.0, threshold=0, directory=str(tmp_path))
+
+    def fail(event):
+        raise RuntimeError('Launch failed.')
+
+    with pytest.raises(RuntimeError):
+        profiler('launch', IDENTIFIER, fail, EVENT)
+
+    if profiling.tracemalloc is not None:
+        assert not profiling.tracemalloc.is_tracing()
+
+
+def test_write_errors_not_raised(tmp_path):
+    '''Log instead of raising when profiles cannot be written.'''
+    path = tmp_path / 'file'
+    path.write_text(u'')
+    profiler = Profiler(sample_rate=1.0, threshold=0, directory=str(path))
+
+    assert profiler('launch', IDENTIFIER, lambda event: 'value', EVENT) == (
+        'value'
+    )
@@ -0,0 +1,150 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import textwrap
+import threading
+
+import pytest
+
+from ftrack_action_handler.reload import Reloader
+from ftrack_action_handler.replay import StandInSession
+
+
+PLUGIN = '''
+import threading
+
+from ftrack_action_handler.action import BaseAction
+
+
+class Action(BaseAction):
+
+    label = 'Test action'
+    identifier = 'test.reload'
+
+    def launch(self, session, entities, event):
+        session.launched.append({version!r})
+        session.release.wait(5)
+        return True
+
+
+def register(session, **kw):
+    if {fail!r}:
+        raise RuntimeError('Registration failed.')
+
+    Action(session).register()
+
+    # Events arriving while the plugin registers.
+    if session.during_register:
+        for subscription, callback in list(
+            session.event_hub.subscriptions.values()
+        ):
+            if 'launch' in subscription:
+                callback(session.event)
+'''
+
+
+@pytest.fixture()
+def session():
+    '''Return session recording the versions of launched actions.'''
+    session = StandInSession()
+    session.launched = []
+    session.release = threading.Event()
+    session.release.set()
+    session.during_register = True
+    session.event = {
+        'id': 'event-1',
+        'topic': 'ftrack.action.launch',
+        'source': {'user': {'username': 'user'}},
+        'data': {'actionIdentifier': 'test.reload'}
+    }
+    return session
+
+
+def write(path, version, fail=False):
+    '''Write plugin of *version* to *path*.'''
+    path.write_text(
+        textwrap.dedent(PLUGIN.format(version=version, fail=fail))
+    )
+
+
+def launch(session):
+    '''Launch all actions subscribed on *session*.'''
+    for subscription, callback in list(
+        session.event_hub.subscriptions.values()
+    ):
+        if 'launch' in subscription:
+            callback(session.event)
+
+
+def test_load_and_unload(tmp_path, session):
+    '''Register actions of plugins and unregister them once removed.'''
+    path = tmp_path / 'plugin.py'
+    write(path, 1)
+    reloader = Reloader(session, [str(tmp_path)])
+
+    reloader.check()
+    assert len(session.event_hub.subscriptions) == 2
+
+    path.unlink()
+    reloader.check()
+    assert session.event_hub.subscriptions == {}
+
+
+def test_events_handled_once_during_reload(tmp_path, session):
+    '''Handle events arriving during a reload by the new actions only.'''
+    path = tmp_path / 'plugin.py'
+    write(path, 1)
+    reloader = Reloader(session, [str(tmp_path)])
+    reloader.reload(str(path))
+    assert session.launched == [1]
+
+    write(path, 2)
+    reloader.reload(str(path))
+    assert session.launched == [1, 2]
+
+    del session.launched[:]
+    launch(session)
+    assert session.launched == [2]
+    assert len(session.event_hub.subscriptions) == 2
+
+
+def test_previous_actions_kept_on_failure(tmp_path, session):
+    '''Keep handling events with the previous actions if loading fails.'''
+    path = tmp_path / 'plugin.py'
+    write(path, 1)
+    reloader = Reloader(session, [str(tmp_path)])
+    reloader.reload(str(path))
+
+    write(path, 2, fail=True)
+    reloader.reload(str(path))
+
+    del session.launched[:]
+    launch(session)
+    assert session.launched == [1]
+
+
+def test_launches_drained(tmp_path, session):
+    '''Wait for launches of replaced actions before unregistering them.'''
+    path = tmp_path / 'plugin.py'
+    write(path, 1)
+    reloader = Reloader(session, [str(tmp_path)])
+    reloader.reload(str(path))
+    del session.launched[:]
+
+    session.release.clear()
+    running = threading.Thread(target=launch, args=(session,))
+    running.start()
+
+    write(path, 2)
+    session.during_register = False
+    reloading = threading.Thread(target=reloader.reload, args=(str(path),))
+    reloading.start()
+
+    reloading.join(0.2)
+    assert reloading.is_alive()
+
+    session.release.set()
+    running.join(5)
+    reloading.join(5)
+    assert not reloading.is_alive()
+    assert session.launched == [1]
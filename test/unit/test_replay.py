@@ -0,0 +1,134 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import json
+
+import pytest
+
+from ftrack_action_handler.action import BaseAction
+from ftrack_action_handler.replay import (
+    Recorder, Replayer, StandInSession, redact
+)
+
+
+class Action(BaseAction):
+    '''Action querying the selected tasks.'''
+
+    label = 'Test action'
+    identifier = 'test.replay'
+
+    def discover(self, session, entities, event):
+        '''Accept any selection.'''
+        return True
+
+    def launch(self, session, entities, event):
+        '''Query selected tasks, failing without a selection.'''
+        if not entities:
+            raise RuntimeError('Nothing selected.')
+
+        list(entities.entities(session))
+        return True
+
+
+def make_event(topic, entity_ids, identifier=Action.identifier):
+    '''Return event of *topic* over *entity_ids*.'''
+    return {
+        'id': 'event-{0}-{1}'.format(topic, len(entity_ids)),
+        'topic': topic,
+        'source': {
+            'user': {'username': 'user'},
+            'apiKey': 'secret-key'
+        },
+        'data': {
+            'actionIdentifier': identifier,
+            'selection': [
+                {'entityType': 'task', 'entityId': entity_id}
+                for entity_id in entity_ids
+            ]
+        }
+    }
+
+
+@pytest.fixture()
+def recorded(tmp_path):
+    '''Return path of events recorded by an action.'''
+    path = str(tmp_path / 'events.jsonl')
+    session = StandInSession(schemas=[{'id': 'Task'}])
+    action = Action(session)
+    action._recorder = Recorder(path)
+
+    action._handle_discover(make_event('ftrack.action.discover', ['task-1']))
+    action._handle_launch(
+        make_event('ftrack.action.launch', ['task-1', 'task-2'])
+    )
+    with pytest.raises(RuntimeError):
+        action._handle_launch(make_event('ftrack.action.launch', []))
+
+    action._handle_launch(
+        make_event('ftrack.action.launch', ['task-1'], identifier='other')
+    )
+
+    return path
+
+
+def test_redact():
+    '''Redact values of sensitive keys at any depth.'''
+    data = {
+        'source': {'apiKey': 'secret', 'user': {'username': 'user'}},
+        'data': [{'password': 'secret', 'name': 'name'}]
+    }
+
+    assert redact(data) == {
+        'source': {'apiKey': '<redacted>', 'user': {'username': 'user'}},
+        'data': [{'password': '<redacted>', 'name': 'name'}]
+    }
+    assert data['source']['apiKey'] == 'secret'
+
+
+def test_recorded_events_redacted(recorded):
+    '''Record handled events with their duration, redacting secrets.'''
+    with open(recorded) as record_file:
+        records = [json.loads(line) for line in record_file]
+
+    assert [record['name'] for record in records] == [
+        'discover', 'launch', 'launch', 'launch'
+    ]
+    for record in records:
+        assert record['identifier'] == Action.identifier
+        assert record['duration'] >= 0
+        assert record['event']['source']['apiKey'] == '<redacted>'
+
+
+def test_replay_report(recorded):
+    '''Replay recorded events to matching actions and report them.'''
+    session = StandInSession(
+        {'Task': [{'id': 'task-1'}, {'id': 'task-2'}]},
+        schemas=[{'id': 'Task'}]
+    )
+    action = Action(StandInSession(schemas=[{'id': 'Task'}]))
+
+    report = Replayer([action], recorded, speed=None, session=session).run()
+
+    assert report['events'] == 4
+    assert report['errors'] == 1
+    assert sorted(report['latency']) == ['discover', 'launch']
+    assert report['calls'] == 1
+    assert report['operations'] == {'query': 1}
+    assert action.session is not session
+
+
+def test_concurrent_replay_report(recorded):
+    '''Replay events concurrently with the same report.'''
+    session = StandInSession(
+        {'Task': [{'id': 'task-1'}, {'id': 'task-2'}]},
+        schemas=[{'id': 'Task'}]
+    )
+    action = Action(StandInSession(schemas=[{'id': 'Task'}]))
+
+    report = Replayer(
+        [action], recorded, speed=None, session=session, concurrency=2
+    ).run()
+
+    assert report['events'] == 4
+    assert report['errors'] == 1
+    assert report['calls'] == 1
@@ -0,0 +1,261 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import time
+
+import ftrack_api
+import pytest
+import requests
+
+from ftrack_action_handler import resilience
+from ftrack_action_handler.action import AdvancedBaseAction
+from ftrack_action_handler.replay import StandInSession
+
+
+class ServerDown(Exception):
+    '''Raise in place of a failing server.'''
+
+
+class Failing(object):
+    '''Callback failing a number of times before returning a value.'''
+
+    def __init__(self, failures, error=ServerDown):
+        '''Initialise callback failing *failures* times with *error*.'''
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        '''Return value once failed enough times.'''
+        self.calls += 1
+        if self.calls <= self.failures:
+            if isinstance(self.error, Exception):
+                raise self.error
+
+            raise self.error()
+
+        return 'value'
+
+
+class RejectingSession(StandInSession):
+    '''Session whose server reports an error for every call.'''
+
+    def call(self, data):
+        '''Record call and raise the error reported by the server.'''
+        self.calls.append(data)
+        raise ftrack_api.exception.ServerError(
+            'Server reported error: ValidationError(Invalid query.)'
+        )
+
+
+class Action(AdvancedBaseAction):
+    '''Action retrying server queries.'''
+
+    label = 'Test action'
+    identifier = 'test.resilience'
+    retry_backoff = 0
+    circuit_failures = 5
+
+
+def http_error(status):
+    '''Return HTTP error for a response with *status*.'''
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError(
+        '{0} Error'.format(status), response=response
+    )
+
+
+def test_breaker_transitions():
+    '''Open after repeated failures, let one trial through and close.'''
+    breaker = resilience.CircuitBreaker(failures=2, reset_timeout=0.05)
+    assert breaker.state == 'closed'
+
+    breaker.failure()
+    assert breaker.state == 'closed'
+    assert breaker.allow()
+
+    breaker.failure()
+    assert breaker.state == 'open'
+    assert breaker.is_open
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == 'half-open'
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.success()
+    assert breaker.state == 'closed'
+    assert breaker.allow()
+
+
+def test_breaker_failed_trial_reopens():
+    '''Open again right away when the trial call fails.'''
+    breaker = resilience.CircuitBreaker(failures=1, reset_timeout=0.05)
+    breaker.failure()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+
+    breaker.failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+
+def test_call_retries_until_success():
+    '''Retry failing callback up to the number of attempts.'''
+    callback = Failing(2)
+    assert resilience.call(
+        callback, attempts=3, backoff=0, exceptions=(ServerDown,)
+    ) == 'value'
+    assert callback.calls == 3
+
+
+def test_call_raises_after_attempts():
+    '''Raise the last error once all attempts failed.'''
+    callback = Failing(5)
+    with pytest.raises(ServerDown):
+        resilience.call(
+            callback, attempts=3, backoff=0, exceptions=(ServerDown,)
+        )
+
+    assert callback.calls == 3
+
+
+def test_call_stops_retrying_once_open():
+    '''Stop retrying as soon as the breaker opens.'''
+    breaker = resilience.CircuitBreaker(failures=2, reset_timeout=60)
+    callback = Failing(5)
+    with pytest.raises(ServerDown):
+        resilience.call(
+            callback, attempts=5, backoff=0, exceptions=(ServerDown,),
+            breaker=breaker
+        )
+
+    assert callback.calls == 2
+    assert breaker.is_open
+
+    with pytest.raises(resilience.CircuitOpenError):
+        resilience.call(
+            callback, attempts=5, backoff=0, exceptions=(ServerDown,),
+            breaker=breaker
+        )
+
+    assert callback.calls == 2
+
+
+def test_call_does_not_retry_other_errors():
+    '''Raise other errors right away without tripping the breaker.'''
+    breaker = resilience.CircuitBreaker(failures=1, reset_timeout=60)
+    callback = Failing(5, error=ValueError)
+    with pytest.raises(ValueError):
+        resilience.call(
+            callback, attempts=3, backoff=0, exceptions=(ServerDown,),
+            breaker=breaker
+        )
+
+    assert callback.calls == 1
+    assert breaker.state == 'closed'
+
+
+def test_breaker_shared_per_settings():
+    '''Share breakers between calls to a server with the same settings.'''
+    server_url = 'http://breaker.localhost'
+    breaker = resilience.breaker(server_url, failures=5, reset_timeout=30)
+
+    assert resilience.breaker(
+        server_url, failures=5, reset_timeout=30
+    ) is breaker
+    assert resilience.breaker(
+        server_url, failures=3, reset_timeout=30
+    ) is not breaker
+    assert resilience.breaker(
+        'http://other.localhost', failures=5, reset_timeout=30
+    ) is not breaker
+
+
+@pytest.mark.parametrize('error, expected', [
+    (requests.exceptions.ConnectionError(), True),
+    (requests.exceptions.Timeout(), True),
+    (http_error(503), True),
+    (http_error(404), False),
+    (
+        ftrack_api.exception.ServerError(
+            '503 Server Error: Service Unavailable for url: http://ftrack'
+        ),
+        True
+    ),
+    (
+        ftrack_api.exception.ServerError(
+            'Server reported error in unexpected format. Raw error was: <html>'
+        ),
+        True
+    ),
+    (
+        ftrack_api.exception.ServerError(
+            'Server reported error: ValidationError({"name": "invalid"})'
+        ),
+        False
+    ),
+    (ftrack_api.exception.ServerError('401 Client Error: Unauthorized'), False),
+    (ValueError(), False)
+], ids=[
+    'connection', 'timeout', 'http 5xx', 'http 4xx', 'server error 5xx',
+    'unexpected format', 'server reported', 'server error 4xx', 'other'
+])
+def test_is_transient(error, expected):
+    '''Tell failures to reach the server from errors it reports.'''
+    assert resilience.is_transient(error) is expected
+
+
+def test_call_raises_reported_errors_right_away():
+    '''Raise errors the server reports without retrying or tripping.'''
+    breaker = resilience.CircuitBreaker(failures=1, reset_timeout=60)
+    callback = Failing(
+        5, error=ftrack_api.exception.ServerError(
+            'Server reported error: PermissionError(Not allowed.)'
+        )
+    )
+
+    with pytest.raises(ftrack_api.exception.ServerError):
+        resilience.call(
+            callback, attempts=3, backoff=0,
+            exceptions=(ftrack_api.exception.ServerError,), breaker=breaker,
+            transient=resilience.is_transient
+        )
+
+    assert callback.calls == 1
+    assert breaker.state == 'closed'
+
+
+def test_call_retries_transient_errors():
+    '''Retry transport failures and count them with the breaker.'''
+    breaker = resilience.CircuitBreaker(failures=5, reset_timeout=60)
+    callback = Failing(2, error=requests.exceptions.ConnectionError)
+
+    assert resilience.call(
+        callback, attempts=3, backoff=0,
+        exceptions=(requests.exceptions.RequestException,), breaker=breaker,
+        transient=resilience.is_transient
+    ) == 'value'
+    assert callback.calls == 3
+    assert breaker.state == 'closed'
+
+
+def test_reported_errors_keep_server_breaker_closed():
+    '''Keep the breaker of the server closed on repeated invalid queries.'''
+    session = RejectingSession(server_url='http://rejecting.localhost')
+    action = Action(session)
+
+    for _ in range(Action.circuit_failures + 1):
+        with pytest.raises(ftrack_api.exception.ServerError):
+            action._call_server_(
+                lambda: session.query('User where name is "a"').first()
+            )
+
+    assert len(session.calls) == Action.circuit_failures + 1
+    assert resilience.breaker(
+        session.server_url, failures=Action.circuit_failures,
+        reset_timeout=Action.circuit_reset_timeout
+    ).state == 'closed'
@@ -0,0 +1,149 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import sys
+import uuid
+
+import pytest
+
+from ftrack_action_handler.action import BaseAction
+from ftrack_action_handler.replay import StandInSession
+from ftrack_action_handler.selection import EntitySelection
+
+
+ENTITIES = [
+    ('Task', 'task-1'),
+    ('Shot', 'shot-1'),
+    ('Task', 'task-2'),
+    ('Task', 'task-1')
+]
+
+
+def test_behaves_like_list():
+    '''Iterate, index and compare like the list it was created from.'''
+    selection = EntitySelection(ENTITIES)
+
+    assert list(selection) == ENTITIES
+    assert len(selection) == 4
+    assert selection[1] == ('Shot', 'shot-1')
+    assert selection[-1] == ('Task', 'task-1')
+    assert selection[1:3] == ENTITIES[1:3]
+    assert selection == ENTITIES
+    assert selection != ENTITIES[:2]
+    assert selection == EntitySelection(ENTITIES)
+    assert selection
+    assert not EntitySelection()
+
+
+def test_grouped_by_type():
+    '''Group unique ids per entity type in selection order.'''
+    selection = EntitySelection(ENTITIES)
+
+    assert selection.types() == ['Task', 'Shot']
+    assert list(selection.by_type().items()) == [
+        ('Task', ['task-1', 'task-2']),
+        ('Shot', ['shot-1'])
+    ]
+    assert selection.ids() == ['task-1', 'task-2', 'shot-1']
+    assert selection.ids('Shot') == ['shot-1']
+    assert selection.ids('Asset') == []
+
+
+def test_contains():
+    '''Test membership of entity type and id tuples.'''
+    selection = EntitySelection(ENTITIES)
+
+    assert ('Task', 'task-2') in selection
+    assert ('Shot', 'task-2') not in selection
+    assert 'task-2' not in selection
+    assert ('Task', 'task-3') not in selection
+    assert ('Asset', 'task-1') not in selection
+
+
+@pytest.mark.parametrize('entities', [
+    [('Task', 'task-1'), ('Task', 'task-2'), ('Shot', 'shot-1')],
+    [('Task', 'task-1'), ('Shot', 'shot-1'), ('Task', 'task-2')],
+    [('Task', 'task-1'), ('Task', 'task-1')],
+    []
+], ids=['grouped', 'interleaved', 'repeated', 'empty'])
+def test_order_kept(entities):
+    '''Keep order and duplicates of the tuples it was created from.'''
+    selection = EntitySelection(iter(entities))
+
+    assert list(selection) == entities
+    assert len(selection) == len(entities)
+    assert [
+        selection[index] for index in range(len(entities))
+    ] == entities
+
+    with pytest.raises(IndexError):
+        selection[len(entities)]
+
+
+def test_entities_loaded_in_batches():
+    '''Load entities with a query per batch of each entity type.'''
+    session = StandInSession({
+        'Task': [{'id': 'task-{0}'.format(index)} for index in range(5)],
+        'Shot': [{'id': 'shot-1'}]
+    })
+    selection = EntitySelection(
+        [('Task', 'task-{0}'.format(index)) for index in range(5)] +
+        [('Shot', 'shot-1'), ('Shot', 'shot-2')]
+    )
+
+    entities = list(
+        selection.entities(session, attributes=['name'], batch_size=2)
+    )
+
+    assert [entity['id'] for entity in entities] == [
+        'task-0', 'task-1', 'task-2', 'task-3', 'task-4', 'shot-1'
+    ]
+    assert len(session.calls) == 4
+    assert session.calls[0][0]['expression'] == (
+        'select name from Task where id in ("task-0", "task-1")'
+    )
+
+
+def test_translated_from_event():
+    '''Translate selected entity types of events with the schemas.'''
+    action = type('Action', (BaseAction,), {
+        'label': 'Test action', 'identifier': 'test.selection'
+    })(StandInSession(schemas=[{'id': 'Task'}, {'id': 'Shot'}]))
+
+    entities, _ = action._translate_event(action.session, {
+        'data': {
+            'selection': [
+                {'entityType': 'task', 'entityId': 'task-1'},
+                {'entityType': 'Shot', 'entityId': 'shot-1'}
+            ]
+        }
+    })
+
+    assert isinstance(entities, EntitySelection)
+    assert entities == [('Task', 'task-1'), ('Shot', 'shot-1')]
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 4), reason='tracemalloc is not available.'
+)
+def test_smaller_than_list():
+    '''Hold less memory than the list of tuples it was created from.'''
+    import tracemalloc
+
+    ids = [str(uuid.uuid4()) for _ in range(20000)]
+
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        entities = [('Task', entity_id) for entity_id in ids]
+        listed = tracemalloc.get_traced_memory()[0] - start
+
+        start = tracemalloc.get_traced_memory()[0]
+        selection = EntitySelection(entities)
+        assert ('Task', ids[-1]) in selection
+        selected = tracemalloc.get_traced_memory()[0] - start
+
+    finally:
+        tracemalloc.stop()
+
+    assert selected < listed / 2
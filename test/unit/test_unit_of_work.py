@@ -0,0 +1,118 @@
+# :coding: utf-8
+# :copyright: Copyright (c) 2024 ftrack
+
+import json
+
+import pytest
+
+from ftrack_action_handler.action import AdvancedBaseAction
+from ftrack_action_handler.replay import StandInSession
+
+
+class Action(AdvancedBaseAction):
+    '''Action committing through the helpers.'''
+
+    label = 'Test action'
+    identifier = 'test.unit_of_work'
+
+
+EVENT = {'source': {'user': {'id': 'user-1', 'username': 'user'}}}
+
+
+def make_session():
+    '''Return session with a user and a task.'''
+    return StandInSession({
+        'User': [{'id': 'user-1', 'username': 'user'}],
+        'Task': [{'id': 'task-1', 'name': 'name'}]
+    })
+
+
+def commits(session):
+    '''Return list of operations committed through *session*.'''
+    return [
+        [operation['action'] for operation in call]
+        for call in session.calls
+        if call[0]['action'] != 'query'
+    ]
+
+
+def test_single_commit():
+    '''Commit changes of helpers once when leaving the unit of work.'''
+    session = make_session()
+    action = Action(session)
+    task = session.get('Task', 'task-1')
+
+    with action.unit_of_work():
+        task['name'] = 'first'
+        action._commit_()
+        task['description'] = 'second'
+        action._commit_()
+
+        assert commits(session) == []
+
+    assert commits(session) == [['update', 'update']]
+
+
+def test_nested_commit_once():
+    '''Commit nested units of work when leaving the outermost one.'''
+    session = make_session()
+    action = Action(session)
+    task = session.get('Task', 'task-1')
+
+    with action.unit_of_work():
+        with action.unit_of_work():
+            task['name'] = 'changed'
+
+        assert commits(session) == []
+
+    assert commits(session) == [['update']]
+
+
+def test_rollback_on_error():
+    '''Roll back deferred changes when the unit of work fails.'''
+    session = make_session()
+    action = Action(session)
+    task = session.get('Task', 'task-1')
+
+    with pytest.raises(RuntimeError):
+        with action.unit_of_work():
+            task['name'] = 'changed'
+            raise RuntimeError('Launch failed.')
+
+    assert commits(session) == []
+    assert task['name'] == 'name'
+    assert not session.recorded_operations
+
+
+def test_flush_commits_early():
+    '''Commit pending operations within the unit of work on flush.'''
+    session = make_session()
+    action = Action(session)
+    task = session.get('Task', 'task-1')
+
+    with action.unit_of_work():
+        task['name'] = 'changed'
+        action.flush()
+        assert commits(session) == [['update']]
+
+    assert commits(session) == [['update']]
+
+
+def test_job_survives_rollback():
+    '''Keep jobs created and failed within a failing unit of work.'''
+    session = make_session()
+    action = Action(session)
+    task = session.get('Task', 'task-1')
+
+    with pytest.raises(RuntimeError):
+        with action.unit_of_work():
+            job_id = action.create_job(EVENT, 'Running')
+            task['name'] = 'changed'
+            action.mark_job_as_failed(job_id, 'Failed')
+            raise RuntimeError('Launch failed.')
+
+    job = session.get('Job', job_id)
+    assert job['status'] == 'failed'
+    assert json.loads(job['data']) == {'description': 'Failed'}
+    assert task['name'] == 'name'
+    assert commits(session) == [['create'], ['update', 'update']]